@@ -10,22 +10,27 @@ from pathlib import Path
 import sys
 import json
 from datetime import datetime
-import pandas as pd
 import hashlib
-
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent))
+import time
+import threading
+from functools import lru_cache
+from itertools import chain
+from types import SimpleNamespace
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# Add parent directory to path for imports (the script re-executes on every rerun)
+APP_DIR = str(Path(__file__).parent)
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
 
 from config import (
     DATA_DIR,
+    INGEST_WORKERS,
+    STREAM_UPDATE_INTERVAL,
     VECTORSTORE_DIR,
     VECTORSTORE_INDEX_PATH
 )
-from loaders.document_loader import DocumentLoader
-from utils.text_splitter import TextSplitter
-from rag.embedder import Embedder
-from rag.retriever import Retriever
-from rag.generator import Generator
 from utils.helpers import (
     setup_logging,
     save_uploaded_file,
@@ -35,8 +40,36 @@ from utils.helpers import (
     clear_vectorstore,
 )
 
-# Setup logging
-setup_logging()
+
+@st.cache_resource(show_spinner=False)
+def _init_logging():
+    """Configure logging once per process rather than on every rerun."""
+    setup_logging()
+
+
+@lru_cache(maxsize=1)
+def _lazy_rag():
+    """
+    Import the heavy RAG modules (LangChain, FAISS, Gemini) on first use.
+    
+    Keeps them off the import path of reruns that never touch the knowledge base.
+    """
+    from loaders.document_loader import DocumentLoader, load_and_split_document
+    from utils.text_splitter import TextSplitter
+    from utils.semantic_cache import SemanticCache
+    from rag.embedder import Embedder
+    from rag.retriever import Retriever
+    from rag.generator import Generator
+    
+    return SimpleNamespace(
+        DocumentLoader=DocumentLoader,
+        load_and_split_document=load_and_split_document,
+        TextSplitter=TextSplitter,
+        SemanticCache=SemanticCache,
+        Embedder=Embedder,
+        Retriever=Retriever,
+        Generator=Generator
+    )
 
 # Page configuration
 st.set_page_config(
@@ -52,665 +85,13 @@ st.set_page_config(
 )
 
 # Custom CSS for Modern UI with Dark Theme
-st.markdown("""
-    <style>
-    /* Hide Streamlit default elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* Dark theme background */
-    .stApp {
-        background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%);
-    }
-    
-    /* Main content background - adjust for sidebar */
-    .main .block-container {
-        background: transparent;
-        padding-top: 2rem;
-        max-width: 100% !important;
-        padding-left: 1rem;
-        padding-right: 1rem;
-    }
-    
-    /* Sidebar dark theme - Stable and adjustable */
-    .css-1d391kg {
-        background: #1a1a2e;
-    }
-    
-    [data-testid="stSidebar"] {
-        background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%);
-        height: 100vh !important;
-        overflow-y: auto !important;
-    }
-    
-    /* Sidebar text */
-    [data-testid="stSidebar"] * {
-        color: #ffffff !important;
-    }
-    
-    /* Make sidebar resizable and always visible */
-    [data-testid="stSidebar"][aria-expanded="true"] {
-        min-width: 21rem !important;
-        max-width: 50% !important;
-    }
-    
-    /* Force sidebar to stay open */
-    [data-testid="stSidebar"] {
-        visibility: visible !important;
-    }
-    
-    /* Hide sidebar collapse button */
-    [data-testid="stSidebar"] [data-testid="collapsedControl"] {
-        display: none !important;
-    }
-    
-    /* Ensure main content adjusts when sidebar is open */
-    section[data-testid="stMain"] {
-        margin-left: 0 !important;
-    }
-    
-    /* Adjust main content width when sidebar is expanded */
-    .main .block-container {
-        width: auto !important;
-    }
-    
-    /* Uploaded files list in sidebar */
-    .uploaded-file-item {
-        padding: 0.75rem;
-        margin: 0.5rem 0;
-        background: rgba(102, 126, 234, 0.2);
-        border-radius: 8px;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        color: #ffffff;
-        font-size: 0.9rem;
-    }
-    
-    /* Simple smooth slide animations */
-    @keyframes smoothSlide {
-        from {
-            opacity: 0;
-            transform: translateY(10px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    .smooth-slide {
-        animation: smoothSlide 0.4s ease-out;
-    }
-    
-    /* Smooth fade for transitions */
-    @keyframes smoothFade {
-        from {
-            opacity: 0;
-        }
-        to {
-            opacity: 1;
-        }
-    }
-    
-    .smooth-fade {
-        animation: smoothFade 0.3s ease-in;
-    }
-    
-    /* Navbar - Dark theme */
-    .navbar {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        padding: 1.25rem 2rem;
-        background: rgba(26, 26, 46, 0.9);
-        border-bottom: 2px solid rgba(102, 126, 234, 0.3);
-        margin-bottom: 1.5rem;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.3);
-        border-radius: 12px;
-    }
-    
-    .navbar-title {
-        font-size: 1.75rem;
-        font-weight: 700;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        color: #ffffff;
-    }
-    
-    .upload-history {
-        display: flex;
-        gap: 0.5rem;
-        flex-wrap: wrap;
-        align-items: center;
-    }
-    
-    .upload-history-item {
-        padding: 0.5rem 1rem;
-        background: #f5f5f5;
-        border-radius: 8px;
-        font-size: 0.9rem;
-        color: #666;
-        cursor: pointer;
-        transition: all 0.2s;
-    }
-    
-    .upload-history-item:hover {
-        background: #e0e0e0;
-    }
-    
-    /* Navbar buttons */
-    .stButton > button[kind="primary"] {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 0.6rem 1.5rem;
-        font-weight: 600;
-        box-shadow: 0 2px 8px rgba(102, 126, 234, 0.3);
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
-        transform: translateY(-2px);
-    }
-    
-    .stButton > button[kind="secondary"] {
-        background: #6c757d;
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 0.6rem 1.5rem;
-        font-weight: 500;
-    }
-    
-    .stButton > button[kind="secondary"]:hover {
-        background: #5a6268;
-        transform: translateY(-2px);
-    }
-    
-    /* Start New Conversation Screen - Dark theme */
-    .start-screen {
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        justify-content: center;
-        min-height: 70vh;
-        padding: 3rem;
-        background: rgba(255, 255, 255, 0.05);
-        border-radius: 16px;
-        margin: 2rem 0;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        backdrop-filter: blur(10px);
-    }
-    
-    .start-icon {
-        font-size: 5rem;
-        margin-bottom: 1.5rem;
-        filter: drop-shadow(0 4px 8px rgba(0,0,0,0.1));
-    }
-    
-    .start-title {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: #ffffff;
-        margin-bottom: 0.75rem;
-        text-align: center;
-    }
-    
-    .start-subtitle {
-        font-size: 1.1rem;
-        color: rgba(255, 255, 255, 0.7);
-        margin-bottom: 3rem;
-        text-align: center;
-        max-width: 600px;
-        line-height: 1.6;
-    }
-    
-    .action-buttons {
-        display: flex;
-        gap: 1.5rem;
-        margin-top: 2rem;
-        width: 100%;
-        max-width: 800px;
-        justify-content: center;
-    }
-    
-    .action-button {
-        padding: 1.2rem 2.5rem;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        font-size: 1.1rem;
-        font-weight: 600;
-        cursor: pointer;
-        transition: all 0.3s;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.3);
-    }
-    
-    .action-button:hover {
-        transform: translateY(-4px);
-        box-shadow: 0 8px 20px rgba(102, 126, 234, 0.4);
-    }
-    
-    /* Document Preview - Dark theme */
-    .doc-preview {
-        background: rgba(255, 255, 255, 0.05);
-        border-radius: 12px;
-        padding: 1.5rem;
-        height: calc(100vh - 200px);
-        overflow-y: auto;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        backdrop-filter: blur(10px);
-    }
-    
-    .doc-preview-header {
-        font-size: 1.3rem;
-        font-weight: 700;
-        margin-bottom: 1.5rem;
-        color: #ffffff;
-        padding-bottom: 0.75rem;
-        border-bottom: 2px solid #667eea;
-    }
-    
-    .doc-item {
-        padding: 1rem;
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 8px;
-        margin-bottom: 0.75rem;
-        border: 2px solid rgba(102, 126, 234, 0.3);
-        cursor: pointer;
-        transition: all 0.3s;
-        box-shadow: 0 1px 3px rgba(0,0,0,0.2);
-        color: #ffffff;
-    }
-    
-    .doc-item:hover {
-        border-color: #667eea;
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
-        transform: translateY(-2px);
-        background: rgba(102, 126, 234, 0.2);
-    }
-    
-    .doc-item.active {
-        border-color: #667eea;
-        background: linear-gradient(135deg, rgba(102, 126, 234, 0.3) 0%, rgba(118, 75, 162, 0.3) 100%);
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.5);
-    }
-    
-    /* Button styling for dark theme */
-    .stButton > button {
-        color: #ffffff !important;
-    }
-    
-    .stButton > button[kind="primary"] {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
-        color: #ffffff !important;
-    }
-    
-    .stButton > button[kind="secondary"] {
-        background: rgba(255, 255, 255, 0.1) !important;
-        color: #ffffff !important;
-        border: 1px solid rgba(102, 126, 234, 0.3) !important;
-    }
-    
-    /* Document Preview Content */
-    .doc-preview-content {
-        background: white;
-        border-radius: 8px;
-        padding: 1.5rem;
-        margin-top: 1rem;
-        border: 1px solid #e9ecef;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-    }
-    
-    .doc-preview-text {
-        color: #ffffff;
-        font-size: 0.95rem;
-        line-height: 1.6;
-        background: rgba(255, 255, 255, 0.1);
-        padding: 1rem;
-        border-radius: 6px;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        max-height: 400px;
-        overflow-y: auto;
-        white-space: pre-wrap;
-        word-wrap: break-word;
-    }
-    
-    .doc-preview-content {
-        background: rgba(255, 255, 255, 0.05);
-        border-radius: 8px;
-        padding: 1.5rem;
-        margin-top: 1rem;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        box-shadow: 0 2px 8px rgba(0,0,0,0.2);
-    }
-    
-    .doc-preview-title {
-        font-size: 1.1rem;
-        font-weight: 600;
-        color: #ffffff;
-        margin-bottom: 1rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 1px solid rgba(102, 126, 234, 0.3);
-    }
-    
-    .doc-preview-title {
-        font-size: 1.1rem;
-        font-weight: 600;
-        color: #212529;
-        margin-bottom: 1rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 1px solid #e9ecef;
-    }
-    
-    /* Chat Container - Dark theme */
-    .chat-container {
-        height: calc(100vh - 200px);
-        display: flex;
-        flex-direction: column;
-        background: rgba(255, 255, 255, 0.05);
-        border-radius: 12px;
-        padding: 1rem;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        backdrop-filter: blur(10px);
-    }
-    
-    .chat-messages {
-        flex: 1;
-        overflow-y: auto;
-        padding: 1rem;
-        background: rgba(255, 255, 255, 0.03);
-        border-radius: 8px;
-    }
-    
-    /* Sources */
-    .sources-container {
-        margin-top: 1rem;
-        padding: 1rem;
-        background: #f8f9fa;
-        border-radius: 8px;
-        border: 1px solid #e9ecef;
-    }
-    
-    .source-item {
-        padding: 0.75rem;
-        margin: 0.5rem 0;
-        background: white;
-        border-radius: 6px;
-        font-size: 0.9rem;
-        border: 1px solid #dee2e6;
-        color: #212529;
-    }
-    
-    /* Follow-up Questions */
-    .follow-up-container {
-        margin-top: 1rem;
-        padding: 0.5rem 0;
-    }
-    
-    .follow-up-question {
-        display: inline-block;
-        padding: 0.6rem 1.2rem;
-        margin: 0.3rem 0.3rem 0.3rem 0;
-        background: linear-gradient(135deg, #f0f4ff 0%, #e8f0fe 100%);
-        color: #667eea;
-        border: 2px solid #667eea;
-        border-radius: 20px;
-        font-size: 0.9rem;
-        font-weight: 500;
-        cursor: pointer;
-        transition: all 0.3s;
-        box-shadow: 0 2px 4px rgba(102, 126, 234, 0.1);
-    }
-    
-    .follow-up-question:hover {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(102, 126, 234, 0.3);
-    }
-    
-    /* Enhanced button styling */
-    .stButton > button {
-        border-radius: 8px;
-        font-weight: 500;
-        transition: all 0.3s;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-    }
-    
-    /* Text area styling for document preview */
-    .stTextArea > div > div > textarea {
-        background-color: #ffffff !important;
-        color: #212529 !important;
-        border: 1px solid #dee2e6 !important;
-        border-radius: 6px !important;
-        padding: 1rem !important;
-        font-size: 0.95rem !important;
-        line-height: 1.6 !important;
-    }
-    
-    /* Info boxes */
-    .stInfo {
-        background: #e7f3ff;
-        border-left: 4px solid #2196F3;
-        color: #0d47a1;
-    }
-    
-    /* Sidebar */
-    .sidebar-content {
-        padding: 1rem;
-    }
-    
-    /* Scrollbar */
-    ::-webkit-scrollbar {
-        width: 10px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: #f1f3f5;
-        border-radius: 10px;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border-radius: 10px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: linear-gradient(135deg, #764ba2 0%, #667eea 100%);
-    }
-    
-    /* Instructions section */
-    .instructions-section {
-        background: rgba(255, 255, 255, 0.05);
-        border-radius: 12px;
-        padding: 2rem;
-        margin: 2rem 0;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        backdrop-filter: blur(10px);
-        color: #ffffff;
-    }
-    
-    .instructions-section h3 {
-        color: #ffffff !important;
-        margin-bottom: 1rem;
-    }
-    
-    .instructions-section ul {
-        margin-left: 1.5rem;
-        line-height: 1.8;
-    }
-    
-    .instructions-section li {
-        margin-bottom: 0.5rem;
-    }
-    
-    /* File uploader styling - Dark theme */
-    .stFileUploader > div > div {
-        background: rgba(255, 255, 255, 0.05) !important;
-        border: 2px dashed #667eea !important;
-        border-radius: 12px !important;
-        padding: 2rem !important;
-        backdrop-filter: blur(10px);
-    }
-    
-    .stFileUploader label {
-        color: #ffffff !important;
-    }
-    
-    /* Text colors for dark theme */
-    h1, h2, h3, h4, h5, h6, p, span, div {
-        color: #ffffff !important;
-    }
-    
-    /* Chat message styling */
-    [data-testid="stChatMessage"] {
-        background: rgba(255, 255, 255, 0.05) !important;
-    }
-    
-    /* Input field styling */
-    .stTextInput > div > div > input {
-        background: rgba(255, 255, 255, 0.1) !important;
-        color: #ffffff !important;
-        border: 1px solid rgba(102, 126, 234, 0.3) !important;
-    }
-    
-    /* Selectbox styling */
-    .stSelectbox > div > div > select {
-        background: rgba(255, 255, 255, 0.1) !important;
-        color: #ffffff !important;
-    }
-    
-    /* Success messages - Dark theme */
-    .stSuccess {
-        background: rgba(40, 167, 69, 0.2);
-        border-left: 4px solid #28a745;
-        color: #90ee90;
-        padding: 1rem;
-        border-radius: 6px;
-    }
-    
-    /* Error messages - Dark theme */
-    .stError {
-        background: rgba(220, 53, 69, 0.2);
-        border-left: 4px solid #dc3545;
-        color: #ff6b6b;
-        padding: 1rem;
-        border-radius: 6px;
-    }
-    
-    /* Info boxes - Dark theme */
-    .stInfo {
-        background: rgba(33, 150, 243, 0.2);
-        border-left: 4px solid #2196F3;
-        color: #81d4fa;
-    }
-    
-    /* Warning messages - Dark theme */
-    .stWarning {
-        background: rgba(255, 193, 7, 0.2);
-        border-left: 4px solid #ffc107;
-        color: #ffd54f;
-    }
-    
-    /* Main content area */
-    .main-content {
-        background: #ffffff;
-        padding: 1.5rem;
-        border-radius: 12px;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-    }
-    
-    /* Confidence score styling */
-    .confidence-score {
-        margin-top: 1rem;
-        padding: 0.75rem 1rem;
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 8px;
-        border-left: 4px solid;
-        font-size: 0.9rem;
-    }
-    
-    .confidence-high {
-        border-left-color: #28a745;
-        color: #90ee90;
-    }
-    
-    .confidence-medium {
-        border-left-color: #ffc107;
-        color: #ffd54f;
-    }
-    
-    .confidence-low {
-        border-left-color: #dc3545;
-        color: #ff6b6b;
-    }
-    
-    /* File item in sidebar */
-    .file-item {
-        padding: 0.75rem;
-        margin: 0.5rem 0;
-        background: rgba(102, 126, 234, 0.1);
-        border-radius: 8px;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        transition: all 0.3s;
-    }
-    
-    .file-item:hover {
-        background: rgba(102, 126, 234, 0.2);
-        border-color: rgba(102, 126, 234, 0.5);
-    }
-    
-    /* Welcome page improvements */
-    .feature-card {
-        padding: 1.5rem;
-        background: rgba(102, 126, 234, 0.2);
-        border-radius: 12px;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        transition: all 0.3s;
-        height: 100%;
-    }
-    
-    .feature-card:hover {
-        transform: translateY(-4px);
-        box-shadow: 0 8px 20px rgba(102, 126, 234, 0.4);
-        border-color: rgba(102, 126, 234, 0.6);
-    }
-    
-    /* Chat input improvements */
-    [data-testid="stChatInput"] {
-        background: rgba(255, 255, 255, 0.1) !important;
-        border: 1px solid rgba(102, 126, 234, 0.3) !important;
-        border-radius: 12px !important;
-    }
-    
-    [data-testid="stChatInput"] textarea {
-        background: rgba(255, 255, 255, 0.1) !important;
-        color: #ffffff !important;
-    }
-    
-    /* Improved button styling */
-    .stButton > button {
-        transition: all 0.3s ease;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
-    }
-    </style>
-""", unsafe_allow_html=True)
+@st.cache_data(show_spinner=False)
+def _load_css() -> str:
+    """Read the app stylesheet once per process."""
+    return (Path(__file__).parent / "static" / "app.css").read_text(encoding="utf-8")
+
+
+st.markdown(f"<style>\n{_load_css()}</style>", unsafe_allow_html=True)
 
 
 def initialize_session_state():
@@ -719,12 +100,10 @@ def initialize_session_state():
         st.session_state.chat_history = []
     if 'vectorstore_loaded' not in st.session_state:
         st.session_state.vectorstore_loaded = False
-    if 'retriever' not in st.session_state:
-        st.session_state.retriever = None
-    if 'generator' not in st.session_state:
-        st.session_state.generator = None
     if 'explain_like_10' not in st.session_state:
         st.session_state.explain_like_10 = False
+    if 'disable_answer_cache' not in st.session_state:
+        st.session_state.disable_answer_cache = False
     if 'uploaded_files' not in st.session_state:
         st.session_state.uploaded_files = []
     if 'pending_question' not in st.session_state:
@@ -739,8 +118,8 @@ def initialize_session_state():
         st.session_state.uploaded_file_names = []
     if 'first_load' not in st.session_state:
         st.session_state.first_load = True
-    if 'processed_file_hashes' not in st.session_state:
-        st.session_state.processed_file_hashes = set()
+    if 'processed_file_batches' not in st.session_state:
+        st.session_state.processed_file_batches = set()
     if 'file_uploader_key' not in st.session_state:
         st.session_state.file_uploader_key = 0
 
@@ -751,6 +130,161 @@ def get_api_key():
     return get_gemini_api_key()
 
 
+def _index_mtime():
+    """Return the vector store index mtime, or None if no index exists yet."""
+    try:
+        return VECTORSTORE_INDEX_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def _get_embedder():
+    """Create the embedder once per process."""
+    return _lazy_rag().Embedder()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_kb_lock():
+    """Create the process-wide lock serializing changes to the shared embedder and vector store."""
+    # Re-entrant: ingest holds it while calling _get_vectorstore, which takes it too
+    return threading.RLock()
+
+
+# One entry per cache: a new index version evicts the old store instead of keeping it in RAM
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _get_vectorstore(index_mtime):
+    """Load the vector store once per index version (keyed by index mtime)."""
+    embedder = _get_embedder()
+    with _get_kb_lock():
+        if embedder.vectorstore is not None and embedder.index_mtime == index_mtime:
+            # Saved by this process: the in-memory store already matches the index on disk
+            return embedder.vectorstore
+        return embedder.load_vectorstore()
+
+
+def _writable_vectorstore(index_mtime):
+    """
+    Copy the cached vector store for an ingest or delete to change.
+    
+    Sessions keep searching the cached store without taking the lock; once the
+    copy is saved, the new index mtime builds a pipeline around it instead.
+    """
+    vectorstore = _get_vectorstore(index_mtime)
+    writable = _get_embedder().copy_vectorstore(vectorstore)
+    writable.indexed_keys = set(_indexed_keys(vectorstore))
+    return writable
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _get_rag_pipeline(index_mtime):
+    """Build the retriever and generator once per index version."""
+    rag = _lazy_rag()
+    retriever = rag.Retriever(_get_vectorstore(index_mtime))
+    generator = rag.Generator(retriever)
+    return retriever, generator
+
+
+def get_generator():
+    """Get the cached generator for the current index, or None if unavailable."""
+    index_mtime = _index_mtime()
+    if index_mtime is None or not validate_api_key(get_api_key()):
+        return None
+    
+    try:
+        _, generator = _get_rag_pipeline(index_mtime)
+    except FileNotFoundError:
+        return None
+    return generator
+
+
+def _release_knowledge_base():
+    """Drop the process-wide vector store and pipeline after the index is cleared."""
+    _get_rag_pipeline.clear()
+    _get_vectorstore.clear()
+    embedder = _get_embedder()
+    with _get_kb_lock():
+        embedder.vectorstore = None
+        embedder.index_mtime = None
+
+
+@st.cache_resource(show_spinner=False)
+def _get_semantic_cache():
+    """Create the semantic answer cache once per process."""
+    return _lazy_rag().SemanticCache(_get_embedder())
+
+
+def answer_question(generator, question: str):
+    """
+    Answer a question, serving near-duplicate questions from the semantic cache.
+    
+    Fresh answers carry an 'answer_stream' to render with st.write_stream; the
+    result is complete (and cached) once that stream has been consumed.
+    """
+    use_cache = not st.session_state.disable_answer_cache
+    cache = _get_semantic_cache()
+    # Partition by knowledge base version and answer mode
+    namespace = (_index_mtime(), st.session_state.explain_like_10)
+    
+    if use_cache:
+        # Embed once: a miss reuses this vector to cache the new answer
+        question_vector = cache.embed(question)
+        use_cache = question_vector is not None
+    
+    if use_cache:
+        cached_result = cache.get(question, namespace, question_vector)
+        if cached_result is not None:
+            return cached_result
+    
+    result = generator.generate_answer_stream(
+        question=question,
+        explain_like_10=st.session_state.explain_like_10
+    )
+    
+    if use_cache:
+        result['answer_stream'] = _cache_after_stream(result, cache, question, namespace, question_vector)
+    
+    return result
+
+
+def _cache_after_stream(result, cache, question: str, namespace, question_vector):
+    """Pass the answer stream through, then cache the completed result."""
+    yield from result['answer_stream']
+    
+    # Only cache real answers, not error/empty-retrieval responses
+    if 'raw_response' in result:
+        cache.put(
+            question,
+            {k: v for k, v in result.items() if k != 'answer_stream'},
+            namespace,
+            question_vector
+        )
+
+
+def _throttle_stream(stream, interval: float = STREAM_UPDATE_INTERVAL):
+    """Coalesce stream chunks so the UI is updated at most once per interval."""
+    buffer = []
+    last_flush = time.monotonic()
+    for chunk in stream:
+        buffer.append(chunk)
+        now = time.monotonic()
+        if now - last_flush >= interval:
+            yield "".join(buffer)
+            buffer.clear()
+            last_flush = now
+    
+    if buffer:
+        yield "".join(buffer)
+
+
+def render_answer(result):
+    """Render the answer text, streaming it when it is freshly generated."""
+    if 'answer_stream' in result:
+        st.write_stream(_throttle_stream(result['answer_stream']))
+    else:
+        st.markdown(f'<div class="smooth-fade">{result["answer"]}</div>', unsafe_allow_html=True)
+
+
 def load_knowledge_base():
     """Load the existing knowledge base."""
     api_key = get_api_key()
@@ -758,14 +292,9 @@ def load_knowledge_base():
         return False
     
     try:
-        embedder = Embedder()
-        vectorstore = embedder.load_vectorstore()
-        
-        retriever = Retriever(vectorstore)
-        generator = Generator(retriever)
+        if get_generator() is None:
+            return False
         
-        st.session_state.retriever = retriever
-        st.session_state.generator = generator
         st.session_state.vectorstore_loaded = True
         
         return True
@@ -776,6 +305,75 @@ def load_knowledge_base():
         return False
 
 
+@st.cache_data(ttl=2, show_spinner=False)
+def _list_uploaded(dir_mtime):
+    """List uploaded files, cached per data directory mtime."""
+    return get_uploaded_files(DATA_DIR)
+
+
+def list_uploaded_files():
+    """Get uploaded files in the data directory without rescanning on every rerun."""
+    return _list_uploaded(os.stat(DATA_DIR).st_mtime_ns)
+
+
+@st.cache_data(ttl=2, show_spinner=False)
+def _list_file_sizes(dir_mtime):
+    """Names and formatted sizes of uploaded files, cached per data directory mtime."""
+    return [
+        (path.name, format_file_size(path.stat().st_size if path.exists() else 0))
+        for path in _list_uploaded(dir_mtime)
+    ]
+
+
+def list_file_sizes():
+    """Get (name, formatted size) for uploaded files without a stat() per file on every rerun."""
+    return _list_file_sizes(os.stat(DATA_DIR).st_mtime_ns)
+
+
+def _chunk_hash(text: str) -> str:
+    """Content hash identifying a chunk in the index."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _chunk_key(doc) -> tuple:
+    """Source file name and content hash identifying a chunk in the index."""
+    file_name = Path(doc.metadata.get('file_path', doc.metadata.get('source', ''))).name
+    return file_name, _chunk_hash(doc.page_content)
+
+
+def _indexed_keys(vectorstore) -> set:
+    """Chunk keys already in a vector store, computed once and kept on the (shared) store object."""
+    if not hasattr(vectorstore, 'indexed_keys'):
+        vectorstore.indexed_keys = {_chunk_key(doc) for doc in vectorstore.docstore._dict.values()}
+    return vectorstore.indexed_keys
+
+
+def _save_with_retry(uploaded_file):
+    """Save an uploaded file, retrying transient failures with backoff."""
+    file_path = None
+    for attempt in range(3):
+        file_path = save_uploaded_file(uploaded_file, DATA_DIR)
+        if file_path:
+            break
+        if attempt < 2:
+            time.sleep(2 ** attempt)
+    return file_path
+
+
+@st.cache_resource(show_spinner=False)
+def _get_ingest_pool():
+    """
+    Process pool for CPU-bound document parsing and splitting, shared per process.
+    
+    Uses spawn so workers never fork the threaded Streamlit server; they start once
+    and are reused across uploads.
+    """
+    return ProcessPoolExecutor(
+        max_workers=INGEST_WORKERS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+
 def process_documents(uploaded_files, progress_bar, status_text):
     """Process uploaded documents and build knowledge base."""
     if not uploaded_files:
@@ -788,88 +386,115 @@ def process_documents(uploaded_files, progress_bar, status_text):
         return False
     
     try:
-        status_text.text("📥 Saving uploaded files...")
-        progress_bar.progress(10)
-        
-        # Save uploaded files
-        saved_files = []
-        for uploaded_file in uploaded_files:
-            file_path = save_uploaded_file(uploaded_file, DATA_DIR)
-            if file_path:
-                saved_files.append(file_path)
-        
-        if not saved_files:
-            st.error("Failed to save uploaded files.")
-            return False
-        
-        status_text.text("📄 Loading documents...")
-        progress_bar.progress(30)
-        
-        # Load documents
-        all_documents = []
-        for file_path in saved_files:
-            docs = DocumentLoader.load_document(str(file_path))
-            all_documents.extend(docs)
-        
-        if not all_documents:
-            st.error("No content extracted from documents.")
-            return False
-        
-        status_text.text("✂️ Splitting documents into chunks...")
-        progress_bar.progress(50)
-        
-        # Split documents
-        splitter = TextSplitter()
-        chunks = splitter.split_documents(all_documents)
-        
-        status_text.text("🔢 Generating embeddings...")
-        progress_bar.progress(70)
-        
-        # Create embeddings and vector store
-        embedder = Embedder()
-        
-        # Check if vectorstore exists
-        if VECTORSTORE_INDEX_PATH.exists():
-            # Add to existing vectorstore
-            embedder.add_documents(chunks)
-            embedder.save_vectorstore()
-        else:
-            # Create new vectorstore
-            vectorstore = embedder.create_vectorstore(chunks)
-            embedder.save_vectorstore(vectorstore)
-        
-        status_text.text("✅ Finalizing knowledge base...")
-        progress_bar.progress(90)
-        
-        # Initialize retriever and generator
-        vectorstore = embedder.load_vectorstore()
-        retriever = Retriever(vectorstore)
-        generator = Generator(retriever)
-        
-        st.session_state.retriever = retriever
-        st.session_state.generator = generator
-        st.session_state.vectorstore_loaded = True
-        
-        # Update uploaded files list - get all files from directory
-        uploaded_files_list = get_uploaded_files(DATA_DIR)
-        st.session_state.uploaded_files = [str(f) for f in uploaded_files_list]
-        st.session_state.uploaded_file_names = [f.name for f in uploaded_files_list]
-        
-        progress_bar.progress(100)
-        status_text.text("✅ Complete!")
-        
-        return True
-        
+        # Other sessions share the embedder and vector store
+        with _get_kb_lock():
+            status_text.text("📥 Saving and loading uploaded files...")
+            progress_bar.progress(10)
+            
+            embedder = _get_embedder()
+            
+            # Start from a copy of the existing vectorstore, if there is one, so searches can go on
+            index_mtime = _index_mtime()
+            embedder.vectorstore = _writable_vectorstore(index_mtime) if index_mtime is not None else None
+            
+            # Keys of chunks already in the index, so only the delta is embedded
+            indexed_keys = _indexed_keys(embedder.vectorstore) if embedder.vectorstore else set()
+            
+            # Save files here, load/split them in worker processes and embed finished ones here
+            load_and_split = _lazy_rag().load_and_split_document
+            pool = _get_ingest_pool()
+            futures = {}
+            for uploaded_file in uploaded_files:
+                file_path = _save_with_retry(uploaded_file)
+                if file_path:
+                    futures[pool.submit(load_and_split, str(file_path))] = file_path
+            saved_count = len(futures)
+            
+            chunk_count = 0
+            new_chunk_count = 0
+            for done, future in enumerate(as_completed(futures), 1):
+                file_path = futures[future]
+                chunks = future.result()
+                
+                chunk_count += len(chunks)
+                new_chunks = []
+                new_keys = set()
+                for chunk in chunks:
+                    chunk_key = _chunk_key(chunk)
+                    if chunk_key not in indexed_keys and chunk_key not in new_keys:
+                        new_keys.add(chunk_key)
+                        new_chunks.append(chunk)
+                
+                if new_chunks:
+                    status_text.text(f"🔢 Generating embeddings for {file_path.name}...")
+                    # add_documents creates the vectorstore on first use
+                    embedder.add_documents(new_chunks)
+                    # Only record the keys once their chunks are actually in the index
+                    indexed_keys |= new_keys
+                    embedder.vectorstore.indexed_keys = indexed_keys
+                    new_chunk_count += len(new_chunks)
+                
+                progress_bar.progress(10 + int(80 * done / len(futures)))
+            
+            if not saved_count:
+                st.error("Failed to save uploaded files.")
+                return False
+            
+            if not chunk_count:
+                st.error("No content extracted from documents.")
+                return False
+            
+            if new_chunk_count:
+                embedder.save_vectorstore()
+            
+            status_text.text("✅ Finalizing knowledge base...")
+            progress_bar.progress(90)
+            
+            # Retriever and generator are rebuilt lazily for the new index mtime
+            st.session_state.vectorstore_loaded = True
+            
+            # Update uploaded files list - get all files from directory
+            uploaded_files_list = list_uploaded_files()
+            st.session_state.uploaded_files = [str(f) for f in uploaded_files_list]
+            st.session_state.uploaded_file_names = [f.name for f in uploaded_files_list]
+            
+            progress_bar.progress(100)
+            status_text.text("✅ Complete!")
+            
+            return True
+            
     except Exception as e:
         st.error(f"Error processing documents: {str(e)}")
         logging.error(f"Error processing documents: {str(e)}", exc_info=True)
         return False
 
 
-def display_chat_message(role: str, content: str):
+def display_chat_message(role: str, content: str, sources: dict = None):
     """Display a chat message using Streamlit's native chat component."""
     with st.chat_message(role):
         st.markdown(content)
+        if sources:
+            render_sources(sources)
+
+
+def summarize_sources(sources: list) -> dict:
+    """Build the source expander label and body once per answer so reruns can reuse them."""
+    return {
+        "files": ", ".join(sorted({source['source'] for source in sources})),
+        "text": "\n\n---\n\n".join(
+            f"**From {source['source']}:**\n{source['content_preview']}" for source in sources
+        ),
+        "count": len(sources)
+    }
+
+
+def render_sources(summary: dict):
+    """Render the combined source information section from a precomputed summary."""
+    st.markdown("---")
+    st.markdown("### 📚 Source Information")
+    with st.expander(f"📄 Sources: {summary['files']}", expanded=False):
+        st.markdown(summary['text'])
+        st.markdown(f"\n**Total Sources Used:** {summary['count']}")
 
 
 def render_navbar():
@@ -931,7 +556,7 @@ def render_document_preview():
             st.markdown('<div class="doc-preview-content">', unsafe_allow_html=True)
             st.markdown('<div class="doc-preview-title">📄 Document Preview</div>', unsafe_allow_html=True)
             try:
-                docs = DocumentLoader.load_document(st.session_state.selected_doc)
+                docs = _lazy_rag().DocumentLoader.load_document(st.session_state.selected_doc)
                 # Show first page/chunk preview with better formatting
                 if docs:
                     # Combine first few pages for better preview
@@ -960,7 +585,6 @@ def render_document_preview():
     
     st.markdown("</div>", unsafe_allow_html=True)
 
-
 def render_chat_interface():
     """Render chat interface - answers only from uploaded files."""
     # Ensure knowledge base is loaded
@@ -977,7 +601,7 @@ def render_chat_interface():
     # Display chat history with smooth animation
     st.markdown('<div class="smooth-slide">', unsafe_allow_html=True)
     for message in st.session_state.chat_history:
-        display_chat_message(message["role"], message["content"])
+        display_chat_message(message["role"], message["content"], message.get("sources"))
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Handle pending question from follow-up - process it immediately
@@ -993,16 +617,14 @@ def render_chat_interface():
         })
         
         # Generate answer
-        if st.session_state.generator:
+        generator = get_generator()
+        if generator:
             with st.spinner("🤔 Analyzing your question and searching knowledge base..."):
-                result = st.session_state.generator.generate_answer(
-                    question=question_to_process,
-                    explain_like_10=st.session_state.explain_like_10
-                )
+                result = answer_question(generator, question_to_process)
             
             # Display answer with confidence score
             with st.chat_message("assistant"):
-                st.markdown(f'<div class="smooth-fade">{result["answer"]}</div>', unsafe_allow_html=True)
+                render_answer(result)
                 
                 # Display confidence score
                 confidence_score = result.get('confidence_score', 0.0)
@@ -1013,29 +635,19 @@ def render_chat_interface():
                            f'(Based on retrieval similarity from uploaded documents)</div>', unsafe_allow_html=True)
                 
                 # Display combined source information
-                if result['sources']:
-                    st.markdown("---")
-                    st.markdown("### 📚 Source Information")
-                    # Combine all sources into one section
-                    all_sources_text = []
-                    all_files = []
-                    for source in result['sources']:
-                        all_files.append(source['source'])
-                        all_sources_text.append(f"**From {source['source']}:**\n{source['content_preview']}")
-                    
-                    with st.expander(f"📄 Sources: {', '.join(set(all_files))}", expanded=False):
-                        st.markdown("\n\n---\n\n".join(all_sources_text))
-                        st.markdown(f"\n**Total Sources Used:** {len(result['sources'])}")
+                sources = summarize_sources(result['sources']) if result['sources'] else None
+                if sources:
+                    render_sources(sources)
             
-            # Add assistant response to history
+            # Add assistant response to history (with the rendered sources for reruns)
             st.session_state.chat_history.append({
                 "role": "assistant",
                 "content": result['answer'],
-                "confidence_score": confidence_score
+                "confidence_score": confidence_score,
+                "sources": sources
             })
         
-        # Rerun to show the response
-        st.rerun()
+        # The new turn is already on screen; no rerun needed to show it
     
     # Chat input
     user_question = st.chat_input("Ask a question about your uploaded documents...")
@@ -1043,7 +655,7 @@ def render_chat_interface():
     # Process question from input
     if user_question:
         # Ensure knowledge base is loaded before processing
-        if not st.session_state.generator:
+        if not get_generator():
             if VECTORSTORE_INDEX_PATH.exists():
                 api_key = get_api_key()
                 if validate_api_key(api_key):
@@ -1061,16 +673,14 @@ def render_chat_interface():
         })
         
         # Generate answer
-        if st.session_state.generator:
+        generator = get_generator()
+        if generator:
             with st.spinner("🤔 Analyzing your question and searching knowledge base..."):
-                result = st.session_state.generator.generate_answer(
-                    question=user_question,
-                    explain_like_10=st.session_state.explain_like_10
-                )
+                result = answer_question(generator, user_question)
             
             # Display answer with confidence score
             with st.chat_message("assistant"):
-                st.markdown(f'<div class="smooth-fade">{result["answer"]}</div>', unsafe_allow_html=True)
+                render_answer(result)
                 
                 # Display confidence score
                 confidence_score = result.get('confidence_score', 0.0)
@@ -1081,25 +691,16 @@ def render_chat_interface():
                            f'(Based on retrieval similarity from uploaded documents)</div>', unsafe_allow_html=True)
                 
                 # Display combined source information
-                if result['sources']:
-                    st.markdown("---")
-                    st.markdown("### 📚 Source Information")
-                    # Combine all sources into one section
-                    all_sources_text = []
-                    all_files = []
-                    for source in result['sources']:
-                        all_files.append(source['source'])
-                        all_sources_text.append(f"**From {source['source']}:**\n{source['content_preview']}")
-                    
-                    with st.expander(f"📄 Sources: {', '.join(set(all_files))}", expanded=False):
-                        st.markdown("\n\n---\n\n".join(all_sources_text))
-                        st.markdown(f"\n**Total Sources Used:** {len(result['sources'])}")
+                sources = summarize_sources(result['sources']) if result['sources'] else None
+                if sources:
+                    render_sources(sources)
             
-            # Add assistant response to history
+            # Add assistant response to history (with the rendered sources for reruns)
             st.session_state.chat_history.append({
                 "role": "assistant",
                 "content": result['answer'],
-                "confidence_score": confidence_score
+                "confidence_score": confidence_score,
+                "sources": sources
             })
         else:
             st.error("❌ Knowledge base not loaded. Please upload documents first.")
@@ -1187,41 +788,47 @@ def delete_file_from_kb(file_name: str):
             if file_name in st.session_state.uploaded_file_names:
                 st.session_state.uploaded_file_names.remove(file_name)
             
-            # Rebuild vectorstore without the deleted file
-            uploaded_files_list = get_uploaded_files(DATA_DIR)
-            if uploaded_files_list:
-                # Clear existing vectorstore
-                clear_vectorstore(VECTORSTORE_DIR)
-                
-                # Rebuild with remaining files
-                all_documents = []
-                for f_path in uploaded_files_list:
-                    docs = DocumentLoader.load_document(str(f_path))
-                    all_documents.extend(docs)
-                
-                if all_documents:
-                    splitter = TextSplitter()
-                    chunks = splitter.split_documents(all_documents)
+            # Other sessions share the embedder and vector store
+            with _get_kb_lock():
+                uploaded_files_list = list_uploaded_files()
+                index_mtime = _index_mtime()
+                if uploaded_files_list and index_mtime is not None:
+                    # Remove only the deleted file's chunks from the existing index
+                    embedder = _get_embedder()
+                    embedder.vectorstore = _writable_vectorstore(index_mtime)
+                    removed_docs = embedder.delete_file_documents(file_name)
+                    embedder.save_vectorstore()
                     
-                    embedder = Embedder()
-                    vectorstore = embedder.create_vectorstore(chunks)
-                    embedder.save_vectorstore(vectorstore)
+                    if hasattr(embedder.vectorstore, 'indexed_keys'):
+                        embedder.vectorstore.indexed_keys -= {_chunk_key(doc) for doc in removed_docs}
+                    st.session_state.vectorstore_loaded = True
+                elif uploaded_files_list:
+                    # No index on disk: rebuild vectorstore from the remaining files
+                    # Clear existing vectorstore
+                    clear_vectorstore(VECTORSTORE_DIR)
                     
-                    # Reload knowledge base
-                    vectorstore = embedder.load_vectorstore()
-                    retriever = Retriever(vectorstore)
-                    generator = Generator(retriever)
+                    # Rebuild with remaining files, loading them in parallel
+                    load_document = _lazy_rag().DocumentLoader.load_document
+                    with ThreadPoolExecutor(max_workers=min(INGEST_WORKERS, len(uploaded_files_list))) as executor:
+                        all_documents = list(chain.from_iterable(
+                            executor.map(load_document, map(str, uploaded_files_list))
+                        ))
                     
-                    st.session_state.retriever = retriever
-                    st.session_state.generator = generator
-                    st.session_state.vectorstore_loaded = True
-            else:
-                # No files left, clear everything
-                clear_vectorstore(VECTORSTORE_DIR)
-                st.session_state.vectorstore_loaded = False
-                st.session_state.retriever = None
-                st.session_state.generator = None
-            
+                    if all_documents:
+                        splitter = _lazy_rag().TextSplitter()
+                        chunks = splitter.split_documents(all_documents)
+                        
+                        embedder = _get_embedder()
+                        vectorstore = embedder.create_vectorstore(chunks)
+                        embedder.save_vectorstore(vectorstore)
+                        
+                        st.session_state.vectorstore_loaded = True
+                else:
+                    # No files left, clear everything
+                    clear_vectorstore(VECTORSTORE_DIR)
+                    _release_knowledge_base()
+                    st.session_state.vectorstore_loaded = False
+                
             return True
         return False
     except Exception as e:
@@ -1229,8 +836,30 @@ def delete_file_from_kb(file_name: str):
         return False
 
 
+@st.fragment
+def render_settings():
+    """
+    Render the answer settings toggles.
+    
+    A fragment: the settings only apply to the next question, so toggling them
+    reruns just this block instead of re-rendering the whole chat history.
+    """
+    st.markdown("### ⚙️ Settings")
+    st.session_state.explain_like_10 = st.toggle(
+        "🧒 Explain Like I'm 10",
+        value=st.session_state.explain_like_10,
+        help="Simplify answers for easier understanding"
+    )
+    st.session_state.disable_answer_cache = st.toggle(
+        "🚫 Do Not Cache Answers",
+        value=st.session_state.disable_answer_cache,
+        help="Always generate a fresh answer instead of reusing answers to similar questions"
+    )
+
+
 def main():
     """Main application function."""
+    _init_logging()
     initialize_session_state()
     
     # Render navbar
@@ -1250,67 +879,61 @@ def main():
             key=f"file_uploader_{st.session_state.file_uploader_key}"
         )
         
+        # Structural identity of the current uploader contents (no hashing needed)
+        batch_key = frozenset((f.name, f.size) for f in uploaded_files) if uploaded_files else None
+        
         # Auto-process when files are uploaded
-        if uploaded_files and not st.session_state.processing:
-            # Create unique identifier for this batch of files
-            file_identifiers = tuple(sorted([f"{f.name}_{f.size}" for f in uploaded_files]))
-            file_batch_hash = hashlib.md5(str(file_identifiers).encode()).hexdigest()
+        if (uploaded_files and not st.session_state.processing
+                and batch_key not in st.session_state.processed_file_batches):
+            # Files on disk are the source of truth; duplicate content under a new
+            # name is caught by the chunk-hash dedupe in process_documents
+            existing_files = {f.name for f in list_uploaded_files()}
+            new_files = [f for f in uploaded_files if f.name not in existing_files]
             
-            # Check if this exact batch has been processed
-            if file_batch_hash not in st.session_state.processed_file_hashes:
-                # Also check if files already exist in data directory
-                existing_files = {f.name for f in get_uploaded_files(DATA_DIR)}
-                uploaded_file_names = {f.name for f in uploaded_files}
-                files_already_exist = uploaded_file_names.issubset(existing_files)
+            if new_files:
+                st.session_state.processing = True
+                progress_bar = st.progress(0)
+                status_text = st.empty()
                 
-                # Only process if files don't already exist
-                if not files_already_exist:
-                    st.session_state.processing = True
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    success = process_documents(uploaded_files, progress_bar, status_text)
-                    
-                    if success:
-                        # Mark this batch as processed
-                        st.session_state.processed_file_hashes.add(file_batch_hash)
-                        # Reset file uploader by changing key to clear it
-                        st.session_state.file_uploader_key += 1
-                        st.success("✅ Documents processed successfully!")
-                        st.session_state.processing = False
-                        st.session_state.first_load = False
-                        # Rerun to clear the file uploader
-                        st.rerun()
-                    else:
-                        st.session_state.processing = False
-                        st.session_state.first_load = False
-                else:
-                    # Files already exist, mark as processed and reset uploader
-                    st.session_state.processed_file_hashes.add(file_batch_hash)
+                success = process_documents(new_files, progress_bar, status_text)
+                
+                if success:
+                    # Mark this batch as processed
+                    st.session_state.processed_file_batches.add(batch_key)
+                    # Reset file uploader by changing key to clear it
                     st.session_state.file_uploader_key += 1
-                    st.info("ℹ️ These files are already in the knowledge base.")
+                    st.success("✅ Documents processed successfully!")
+                    st.session_state.processing = False
+                    st.session_state.first_load = False
+                    # Rerun to clear the file uploader
                     st.rerun()
+                else:
+                    st.session_state.processing = False
+                    st.session_state.first_load = False
+            else:
+                # Files already exist, mark as processed and reset uploader
+                st.session_state.processed_file_batches.add(batch_key)
+                st.session_state.file_uploader_key += 1
+                st.info("ℹ️ These files are already in the knowledge base.")
+                st.rerun()
         
         st.markdown("---")
         
         # File Database - Show uploaded files with delete option
         st.markdown("### 📚 Knowledge Base Files")
-        uploaded_files_list = get_uploaded_files(DATA_DIR)
+        uploaded_files_list = list_uploaded_files()
         
         if uploaded_files_list:
             # Update session state with current files
             current_file_names = [f.name for f in uploaded_files_list]
             st.session_state.uploaded_file_names = current_file_names
             
-            for idx, file_path in enumerate(uploaded_files_list):
-                file_name = file_path.name
-                file_size = file_path.stat().st_size if file_path.exists() else 0
-                
+            for idx, (file_name, file_size) in enumerate(list_file_sizes()):
                 # File item with delete button
                 col1, col2 = st.columns([3, 1])
                 with col1:
                     st.markdown(f"📄 **{file_name}**")
-                    st.caption(f"{format_file_size(file_size)}")
+                    st.caption(file_size)
                 with col2:
                     if st.button("🗑️", key=f"delete_{idx}", help=f"Delete {file_name}"):
                         if delete_file_from_kb(file_name):
@@ -1324,19 +947,14 @@ def main():
         st.markdown("---")
         
         # Settings
-        st.markdown("### ⚙️ Settings")
-        st.session_state.explain_like_10 = st.toggle(
-            "🧒 Explain Like I'm 10",
-            value=st.session_state.explain_like_10,
-            help="Simplify answers for easier understanding"
-        )
+        render_settings()
         
         # Status indicator
         st.markdown("---")
         st.markdown("### 📊 Status")
         if st.session_state.vectorstore_loaded:
             st.success("✅ Knowledge Base Active")
-            uploaded_files_list = get_uploaded_files(DATA_DIR)
+            uploaded_files_list = list_uploaded_files()
             st.metric("📄 Documents", len(uploaded_files_list))
             st.metric("💬 Messages", len(st.session_state.chat_history))
         else:
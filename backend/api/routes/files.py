@@ -4,6 +4,7 @@ File management endpoints.
 
 from fastapi import APIRouter, HTTPException
 from typing import Optional
+import asyncio
 from bson import ObjectId
 
 from models.file import FileListResponse, FileInfo, FileDeleteResponse
@@ -74,9 +75,9 @@ async def delete_file(file_id: str):
     s3_key = file_data.get("s3_key")
     filename = file_data.get("filename", "")
     
-    # Delete from S3
+    # Delete from S3 (blocking boto3 call, run off the event loop)
     if s3_key:
-        s3_service.delete_file(s3_key)
+        await asyncio.to_thread(s3_service.delete_file, s3_key)
     
     # Delete from MongoDB
     deleted = await mongodb_service.delete_file_metadata(file_id)
@@ -6,6 +6,7 @@ from fastapi import APIRouter
 from datetime import datetime
 from services.mongodb import mongodb_service
 from services.s3 import s3_service
+from core.security import token_cache_info
 
 router = APIRouter()
 
@@ -35,3 +36,8 @@ async def detailed_health_check():
         }
     }
 
+
+@router.get("/auth-cache")
+async def auth_cache_stats():
+    """JWT decode cache statistics."""
+    return token_cache_info()
@@ -2,15 +2,19 @@
 Query endpoints for RAG system.
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from typing import Optional
+import asyncio
 import logging
+import orjson
 
 from models.query import QueryRequest, QueryResponse, ConfidenceBreakdown
 from rag.embedder import Embedder
 from rag.retriever import Retriever
 from rag.generator import Generator
 from services.mongodb import mongodb_service
+from services.query_cache import query_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -28,8 +32,9 @@ def get_generator() -> Generator:
     if _generator is None:
         try:
             _embedder = Embedder()
-            vectorstore = _embedder.load_vectorstore()
-            _retriever = Retriever(vectorstore)
+            # Query-side store is search-only, so it can be memory-mapped
+            vectorstore = _embedder.load_vectorstore(mmap=True)
+            _retriever = Retriever(vectorstore, embedder=_embedder)
             _generator = Generator(_retriever)
         except FileNotFoundError:
             raise HTTPException(
@@ -43,8 +48,52 @@ def get_generator() -> Generator:
     return _generator
 
 
+def _log_query(request: QueryRequest, result: dict, background_tasks: BackgroundTasks):
+    """Log a query to MongoDB: batched by the chat log writer, or after the response is sent."""
+    chat_log = {
+        "question": request.question,
+        "answer": result['answer'],
+        "confidence_score": result['confidence_score'],
+        "sources_count": len(result['sources']),
+        "explain_mode": request.explain_like_10
+    }
+    if not mongodb_service.enqueue_chat_log(chat_log):
+        background_tasks.add_task(mongodb_service.insert_chat_log, chat_log)
+
+
+def _response_payload(request: QueryRequest, result: dict) -> dict:
+    """Validate a generator result as a QueryResponse and dump it for encoding."""
+    confidence_breakdown = None
+    if result.get('confidence_breakdown'):
+        cb = result['confidence_breakdown']
+        confidence_breakdown = ConfidenceBreakdown(
+            best_similarity=cb['best_similarity'],
+            avg_similarity=cb['avg_similarity'],
+            consistency=cb['consistency'],
+            keyword_match=cb['keyword_match'],
+            final_score=cb['final_score']
+        )
+    
+    response = QueryResponse(
+        answer=result['answer'],
+        sources=result['sources'],
+        confidence_score=result['confidence_score'],
+        confidence_breakdown=confidence_breakdown,
+        similarity_scores=result['similarity_scores'],
+        query=request.question,
+        timestamp=result['timestamp'],
+        explain_mode=request.explain_like_10
+    )
+    return response.model_dump()
+
+
+def _sse(event: str, data) -> bytes:
+    """Encode one Server-Sent Event with a JSON payload."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
 @router.post("/", response_model=QueryResponse)
-async def query_knowledge_base(request: QueryRequest):
+async def query_knowledge_base(request: QueryRequest, background_tasks: BackgroundTasks):
     """
     Query the knowledge base with a question.
     
@@ -53,43 +102,27 @@ async def query_knowledge_base(request: QueryRequest):
     generator = get_generator()
     
     try:
-        result = generator.generate_answer(
+        # Near-duplicate questions reuse the earlier answer; on a miss the
+        # retriever finds this embedding in the embedder's query cache
+        question_embedding = await asyncio.to_thread(_retriever.query_embedding, request.question)
+        cache_namespace = (request.explain_like_10, request.top_k)
+        cached = query_cache.get(question_embedding, cache_namespace)
+        if cached is not None:
+            _log_query(request, cached, background_tasks)
+            return ORJSONResponse(dict(cached, query=request.question))
+        
+        result = await generator.agenerate_answer(
             question=request.question,
             explain_like_10=request.explain_like_10,
             top_k=request.top_k
         )
         
-        # Convert to response model
-        confidence_breakdown = None
-        if result.get('confidence_breakdown'):
-            cb = result['confidence_breakdown']
-            confidence_breakdown = ConfidenceBreakdown(
-                best_similarity=cb['best_similarity'],
-                avg_similarity=cb['avg_similarity'],
-                consistency=cb['consistency'],
-                keyword_match=cb['keyword_match'],
-                final_score=cb['final_score']
-            )
-        
-        # Log query to MongoDB
-        await mongodb_service.insert_chat_log({
-            "question": request.question,
-            "answer": result['answer'],
-            "confidence_score": result['confidence_score'],
-            "sources_count": len(result['sources']),
-            "explain_mode": request.explain_like_10
-        })
+        _log_query(request, result, background_tasks)
         
-        return QueryResponse(
-            answer=result['answer'],
-            sources=result['sources'],
-            confidence_score=result['confidence_score'],
-            confidence_breakdown=confidence_breakdown,
-            similarity_scores=result['similarity_scores'],
-            query=request.question,
-            timestamp=result['timestamp'],
-            explain_mode=request.explain_like_10
-        )
+        # Already validated here; returning a Response skips FastAPI re-validating it
+        payload = _response_payload(request, result)
+        query_cache.put(question_embedding, payload, cache_namespace)
+        return ORJSONResponse(payload)
     
     except HTTPException:
         raise
@@ -97,3 +130,47 @@ async def query_knowledge_base(request: QueryRequest):
         logger.error(f"Error processing query: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
+
+@router.post("/stream")
+async def query_knowledge_base_stream(request: QueryRequest, background_tasks: BackgroundTasks):
+    """
+    Query the knowledge base, streaming the answer as Server-Sent Events.
+    
+    Emits a 'sources' event (sources and confidence), 'token' events with answer
+    text as the model generates it, then a 'done' event with the same payload as POST /.
+    """
+    generator = get_generator()
+    
+    try:
+        question_embedding = await asyncio.to_thread(_retriever.query_embedding, request.question)
+    except Exception as e:
+        logger.error(f"Error processing query: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+    
+    cache_namespace = (request.explain_like_10, request.top_k)
+    cached = query_cache.get(question_embedding, cache_namespace)
+    
+    async def events():
+        if cached is not None:
+            _log_query(request, cached, background_tasks)
+            yield _sse('sources', {
+                key: cached[key]
+                for key in ('sources', 'confidence_score', 'confidence_breakdown', 'similarity_scores')
+            })
+            yield _sse('token', cached['answer'])
+            yield _sse('done', dict(cached, query=request.question))
+            return
+        
+        async for event, data in generator.agenerate_answer_stream(
+            question=request.question,
+            explain_like_10=request.explain_like_10,
+            top_k=request.top_k
+        ):
+            # Only complete answers carry a timestamp; error/empty results are passed through
+            if event == 'done' and 'timestamp' in data:
+                _log_query(request, data, background_tasks)
+                data = _response_payload(request, data)
+                query_cache.put(question_embedding, data, cache_namespace)
+            yield _sse(event, data)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", background=background_tasks)
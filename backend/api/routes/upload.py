@@ -3,18 +3,23 @@ File upload endpoints.
 """
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
+import asyncio
+import hashlib
 import logging
 import uuid
 from pathlib import Path
 from datetime import datetime
 import tempfile
 import os
+import shutil
+from typing import Dict, List, Optional, Tuple
 
 from core.config import settings
 from models.file import FileUploadResponse
 from services.s3 import s3_service
 from services.mongodb import mongodb_service
+from services.query_cache import query_cache
 from rag.processor import DocumentProcessor
 from rag.embedder import Embedder
 
@@ -23,64 +28,137 @@ logger = logging.getLogger(__name__)
 
 # Global embedder instance (lazy loaded)
 _embedder: Embedder = None
+_embedder_lock = asyncio.Lock()
 
 
-def get_embedder() -> Embedder:
-    """Get or create embedder instance."""
+# Lower-cased once so the per-upload check is a set lookup
+_ALLOWED_EXTENSIONS = frozenset(ext.lower() for ext in settings.ALLOWED_EXTENSIONS)
+
+# Status of uploads whose content was already ingested
+DUPLICATE_STATUS = "duplicate"
+
+# Read uploads in 1 MB pieces so a request never holds the whole file in memory
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+async def _stream_to_temp_file(file: UploadFile, suffix: str) -> Tuple[str, int, str]:
+    """
+    Stream an upload into a temp file, enforcing MAX_FILE_SIZE as it arrives.
+    
+    Args:
+        file: Uploaded file
+        suffix: Temp file suffix (the file extension)
+        
+    Returns:
+        Tuple of (temp file path, size in bytes, SHA-256 hex digest)
+    """
+    hasher = hashlib.sha256()
+    total = 0
+    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    
+    try:
+        with tmp_file:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                total += len(chunk)
+                if total > settings.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / (1024*1024):.1f}MB"
+                    )
+                hasher.update(chunk)
+                await asyncio.to_thread(tmp_file.write, chunk)
+    except BaseException:
+        os.unlink(tmp_file.name)
+        raise
+    
+    return tmp_file.name, total, hasher.hexdigest()
+
+
+def _copy_file(src: str, dst: Path):
+    """Copy a file, creating the destination directory."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(src, dst)
+
+
+def _upload_path_to_s3(path: str, filename: str, content_type: str) -> str:
+    """Stream a local file to S3."""
+    with open(path, "rb") as f:
+        return s3_service.upload_fileobj(f, filename, content_type)
+
+
+def _build_embedder() -> Embedder:
+    """Create the embedder and load the existing vectorstore, if any."""
+    embedder = Embedder()
+    # Try to load existing vectorstore
+    try:
+        embedder.load_vectorstore()
+    except FileNotFoundError:
+        logger.info("No existing vectorstore found, will create new one")
+    return embedder
+
+
+async def get_embedder() -> Embedder:
+    """Get or create embedder instance (concurrent first requests load the store once)."""
     global _embedder
     if _embedder is None:
-        _embedder = Embedder()
-        # Try to load existing vectorstore
-        try:
-            _embedder.load_vectorstore()
-        except FileNotFoundError:
-            logger.info("No existing vectorstore found, will create new one")
+        async with _embedder_lock:
+            if _embedder is None:
+                _embedder = await asyncio.to_thread(_build_embedder)
     return _embedder
 
 
-@router.post("/", response_model=FileUploadResponse)
-async def upload_file(file: UploadFile = File(...)):
+async def _ingest_one(file: UploadFile) -> Tuple[FileUploadResponse, Optional[Dict]]:
     """
-    Upload and process a document file.
+    Store, parse and embed one uploaded file without saving the vector store.
     
-    Supports: PDF, DOCX, DOC, TXT
+    Args:
+        file: Uploaded file
+        
+    Returns:
+        Tuple of (upload response, file metadata to record or None for duplicates)
     """
     # Validate file extension
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in settings.ALLOWED_EXTENSIONS:
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in _ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail=f"Unsupported file type. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
         )
     
-    # Validate file size
-    file_content = await file.read()
-    if len(file_content) > settings.MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / (1024*1024):.1f}MB"
-        )
+    # Stream to a temp file, validating size as it arrives (raises 400 when too large)
+    tmp_path, file_size, content_hash = await _stream_to_temp_file(file, file_ext)
     
     try:
-        # Save file temporarily for processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-            tmp_file.write(file_content)
-            tmp_path = tmp_file.name
-        
         try:
-            # Process document
+            # Identical content already ingested: skip parsing, storage and embedding
+            existing = await mongodb_service.get_processed_file_by_hash(content_hash)
+            if existing:
+                response = FileUploadResponse(
+                    file_id=existing["file_id"],
+                    filename=file.filename,
+                    file_size=file_size,
+                    file_type=file_ext,
+                    s3_key=existing["s3_key"],
+                    status=DUPLICATE_STATUS,
+                    message="File already in knowledge base (deduplicated)",
+                    uploaded_at=existing.get("created_at") or datetime.utcnow()
+                )
+                return response, None
+            
+            # Process document (parsing runs off the event loop)
             processor = DocumentProcessor()
-            documents = processor.load_document(tmp_path)
-            chunks = processor.split_documents(documents)
+            documents = await asyncio.to_thread(processor.load_document, tmp_path)
+            chunks = await asyncio.to_thread(processor.split_documents, documents)
             
             # Upload to S3 (if configured) or use local storage
             s3_key = None
             if s3_service.client:
                 try:
-                    s3_key = s3_service.upload_file(
-                        file_content=file_content,
-                        filename=file.filename,
-                        content_type=file.content_type or "application/octet-stream"
+                    s3_key = await asyncio.to_thread(
+                        _upload_path_to_s3,
+                        tmp_path,
+                        file.filename,
+                        file.content_type or "application/octet-stream"
                     )
                 except Exception as e:
                     logger.warning(f"S3 upload failed, using local storage: {str(e)}")
@@ -88,48 +166,38 @@ async def upload_file(file: UploadFile = File(...)):
             # If S3 not available, save locally
             if not s3_key:
                 local_file_path = Path(settings.UPLOAD_DIR) / f"{uuid.uuid4().hex[:8]}_{file.filename}"
-                local_file_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(local_file_path, "wb") as f:
-                    f.write(file_content)
+                await asyncio.to_thread(_copy_file, tmp_path, local_file_path)
                 s3_key = str(local_file_path)  # Use local path as identifier
             
             # Generate file ID
             file_id = str(uuid.uuid4())
             
-            # Save to MongoDB (if configured) or skip
+            # Recorded in MongoDB by the caller, batched with the other uploads
             file_metadata = {
                 "file_id": file_id,
                 "filename": file.filename,
-                "file_size": len(file_content),
+                "file_size": file_size,
                 "file_type": file_ext,
+                "sha256": content_hash,
                 "s3_key": s3_key,
-                "processed": False,
-                "chunk_count": len(chunks)
+                "processed": False
             }
             
-            mongodb_id = None
-            if mongodb_service.db:
-                mongodb_id = await mongodb_service.insert_file_metadata(file_metadata)
-            
-            # Add documents to vectorstore
-            embedder = get_embedder()
-            embedder.add_documents(chunks)
-            embedder.save_vectorstore()
-            
-            # Update metadata as processed (if MongoDB available)
-            if mongodb_id and mongodb_service.db:
-                await mongodb_service.update_file_metadata(mongodb_id, {"processed": True})
+            # Add documents to vectorstore (saved by the caller); near-duplicate chunks are skipped
+            embedder = await get_embedder()
+            file_metadata["chunk_count"] = await embedder.aadd_documents(chunks)
             
-            return FileUploadResponse(
+            response = FileUploadResponse(
                 file_id=file_id,
                 filename=file.filename,
-                file_size=len(file_content),
+                file_size=file_size,
                 file_type=file_ext,
                 s3_key=s3_key,
                 status="success",
                 message="File uploaded and processed successfully",
                 uploaded_at=datetime.utcnow()
             )
+            return response, file_metadata
             
         finally:
             # Clean up temp file
@@ -141,6 +209,37 @@ async def upload_file(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 
+async def _save_and_record(files_metadata: List[Dict]):
+    """Record the ingested files, write the vector store once, then flag the files as processed."""
+    # Insert metadata in one round trip (if MongoDB available)
+    mongodb_ids = await mongodb_service.bulk_insert_file_metadata(files_metadata)
+    
+    try:
+        embedder = await get_embedder()
+        await embedder.asave_vectorstore()
+        # Cached answers may no longer reflect the knowledge base
+        query_cache.clear()
+    except Exception as e:
+        logger.error(f"Error saving vector store: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error saving knowledge base: {str(e)}")
+    
+    # Update metadata as processed (if MongoDB available)
+    await mongodb_service.mark_files_processed(mongodb_ids)
+
+
+@router.post("/", response_model=FileUploadResponse)
+async def upload_file(file: UploadFile = File(...)):
+    """
+    Upload and process a document file.
+    
+    Supports: PDF, DOCX, DOC, TXT
+    """
+    response, file_metadata = await _ingest_one(file)
+    if file_metadata is not None:
+        await _save_and_record([file_metadata])
+    return ORJSONResponse(response.model_dump())
+
+
 @router.post("/batch")
 async def upload_files(files: list[UploadFile] = File(...)):
     """
@@ -148,16 +247,34 @@ async def upload_files(files: list[UploadFile] = File(...)):
     """
     results = []
     errors = []
+    semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_UPLOADS)
     
-    for file in files:
-        try:
-            result = await upload_file(file)
-            results.append(result.dict())
-        except Exception as e:
+    async def ingest(file: UploadFile):
+        async with semaphore:
+            return await _ingest_one(file)
+    
+    # Parsing, storage and embedding of different files overlap
+    outcomes = await asyncio.gather(
+        *(ingest(file) for file in files),
+        return_exceptions=True
+    )
+    
+    files_metadata = []
+    for file, outcome in zip(files, outcomes):
+        if isinstance(outcome, Exception):
             errors.append({
                 "filename": file.filename,
-                "error": str(e)
+                "error": str(outcome)
             })
+        else:
+            response, file_metadata = outcome
+            results.append(response.dict())
+            if file_metadata is not None:
+                files_metadata.append(file_metadata)
+    
+    # One index write and one metadata insert for the whole batch instead of one per file
+    if files_metadata:
+        await _save_and_record(files_metadata)
     
     return {
         "successful": results,
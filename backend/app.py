@@ -3,13 +3,16 @@ FastAPI application entry point for Knowledge Base RAG System.
 """
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 import logging
 from contextlib import asynccontextmanager
+import faiss
 
 from core.config import settings
 from api.routes import upload, query, files, health
+from services.mongodb import mongodb_service
 
 # Setup logging
 logging.basicConfig(
@@ -25,9 +28,21 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Knowledge Base RAG API...")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
+    await mongodb_service.create_indexes()
+    await mongodb_service.start_chat_log_writer()
+    
+    faiss.omp_set_num_threads(max(1, settings.FAISS_THREADS))
+    
+    # Load the vector store now so the first upload doesn't pay for it
+    try:
+        await upload.get_embedder()
+    except Exception as e:
+        logger.warning(f"Embedder pre-warm skipped: {str(e)}")
+    
     yield
     # Shutdown
     logger.info("Shutting down Knowledge Base RAG API...")
+    await mongodb_service.stop_chat_log_writer()
 
 
 # Create FastAPI app
@@ -35,7 +50,8 @@ app = FastAPI(
     title="Knowledge Base RAG API",
     description="Production-ready RAG system with document upload, vector search, and AI-powered Q&A",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson encodes large query payloads much faster
 )
 
 # CORS middleware
@@ -79,10 +95,13 @@ if __name__ == "__main__":
     # Use 127.0.0.1 for Windows local development, 0.0.0.0 for Linux/Docker
     host = "127.0.0.1" if sys.platform == "win32" and settings.ENVIRONMENT == "development" else "0.0.0.0"
     
+    # uvloop and httptools come with uvicorn[standard]; uvloop has no Windows build
     uvicorn.run(
         "app:app",
         host=host,
         port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
         reload=settings.ENVIRONMENT == "development",
         log_level="info"
     )
@@ -38,10 +38,16 @@ class Settings(BaseSettings):
     AWS_REGION: str = "us-east-1"
     S3_BUCKET_NAME: str = ""
     S3_ENDPOINT_URL: str = ""  # Optional, for S3-compatible services
+    S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024  # Multipart threshold and part size
+    S3_MAX_CONCURRENCY: int = 8  # Parts uploaded in parallel
+    PRESIGNED_URL_CACHE_SIZE: int = 4096  # Signed URLs reused while they have >= half their lifetime left
     
     # MongoDB Configuration
     MONGODB_URI: str = ""
     MONGODB_DB_NAME: str = "kb_rag"
+    MONGODB_MAX_POOL_SIZE: int = 50
+    CHAT_LOG_BATCH_SIZE: int = 50  # Max chat logs per insert_many
+    CHAT_LOG_FLUSH_INTERVAL: float = 0.1  # Seconds to wait for a batch to fill
     
     # Vector Store Configuration
     VECTOR_STORE_TYPE: str = "faiss"  # "faiss" or "mongodb"
@@ -51,6 +57,23 @@ class Settings(BaseSettings):
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
     TOP_K_CHUNKS: int = 5
+    QUERY_EMBEDDING_CACHE_SIZE: int = 4096  # LRU entries for query embeddings
+    EMBED_BATCH_SIZE: int = 100  # Texts per embedding request
+    EMBED_CONCURRENCY: int = 4  # Embedding requests in flight at once
+    VECTOR_STORE_INDEX_TYPE: str = "auto"  # "auto" (flat, IVFPQ when large), "flat" or "hnsw"
+    EMBEDDING_QUANTIZATION: str = "fp16"  # Flat/HNSW vector storage: "fp16", "int8" or "fp32"
+    NORMALIZE_EMBEDDINGS: bool = True  # New stores use unit vectors (L2 ranks like cosine); saved stores keep theirs
+    IVFPQ_MIN_VECTORS: int = 2000  # Switch the flat index to IVFPQ above this size
+    IVFPQ_NPROBE: int = 16  # IVF lists probed per query
+    HNSW_M: int = 32  # Graph neighbours per node
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    FAISS_THREADS: int = 2  # OpenMP threads per worker process; keeps workers from oversubscribing cores
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97  # Cosine similarity for reusing a cached answer
+    SEMANTIC_CACHE_TTL: int = 3600  # Seconds
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1024  # Per answer mode / top_k
+    NEAR_DUPLICATE_SIMILARITY: float = 0.95  # Skip new chunks this close to a stored one; 0 disables
+    DOCSTORE_FORMAT: str = "pickle"  # "pickle" (FAISS.save_local) or "arrow" (memory-mapped, needs pyarrow)
     TEMPERATURE: float = 0.7
     MAX_TOKENS: int = 1000
     
@@ -58,10 +81,12 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
     ALLOWED_EXTENSIONS: List[str] = [".pdf", ".docx", ".doc", ".txt"]
     UPLOAD_DIR: str = "./uploads"  # Temporary local storage before S3
+    MAX_CONCURRENT_UPLOADS: int = 4  # Files processed at once by /upload/batch
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_DECODE_CACHE_SIZE: int = 4096  # Verified JWT payloads kept in memory
     
     # Logging
     LOG_LEVEL: str = "INFO"
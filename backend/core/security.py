@@ -2,7 +2,10 @@
 Security utilities for authentication and authorization.
 """
 
+import asyncio
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -28,6 +31,16 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop (bcrypt takes ~100 ms)."""
+    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    """Hash a password without blocking the event loop."""
+    return await asyncio.to_thread(pwd_context.hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -41,15 +54,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[dict]:
-    """Decode and verify a JWT token."""
+@lru_cache(maxsize=settings.TOKEN_DECODE_CACHE_SIZE)
+def _decode_cached(token: str) -> Optional[dict]:
+    """Verify a token once; repeat requests with the same token skip the HMAC and JSON work."""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        return payload
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
     except JWTError:
         return None
 
 
+def decode_access_token(token: str) -> Optional[dict]:
+    """Decode and verify a JWT token."""
+    payload = _decode_cached(token)
+    if payload is None:
+        return None
+    
+    # A cached token keeps its verified payload past expiry, so re-check exp here
+    exp = payload.get("exp")
+    if exp is not None and exp < time.time():
+        return None
+    
+    return dict(payload)
+
+
+def token_cache_info() -> dict:
+    """Hit/miss statistics of the token decode cache."""
+    return _decode_cached.cache_info()._asdict()
+
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """
     Dependency to get current authenticated user from JWT token.
@@ -0,0 +1,120 @@
+"""
+Docstore backed by a memory-mapped Arrow IPC (Feather) file.
+Documents are materialized on lookup instead of being unpickled up front.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Union
+import pyarrow as pa
+import pyarrow.feather as feather
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+
+class ArrowDocstore(Docstore, AddableMixin):
+    """Arrow table of saved documents plus an in-memory overlay of documents added since."""
+    
+    def __init__(self, table: pa.Table = None):
+        """
+        Initialize the docstore.
+        
+        Args:
+            table: Saved documents with id, text, metadata (JSON) and position columns
+        """
+        self._table = table
+        self._rows: Dict[str, int] = {}
+        if table is not None:
+            self._rows = {doc_id: row for row, doc_id in enumerate(table.column("id").to_pylist())}
+        self._added: Dict[str, Document] = {}
+    
+    @classmethod
+    def load(cls, path: Path) -> "ArrowDocstore":
+        """Open a saved docstore; text and metadata stay in the page cache until read."""
+        return cls(feather.read_table(str(path), memory_map=True))
+    
+    def index_to_docstore_id(self) -> Dict[int, str]:
+        """FAISS position -> document id mapping for the saved documents."""
+        if self._table is None:
+            return {}
+        return dict(zip(
+            self._table.column("position").to_pylist(),
+            self._table.column("id").to_pylist()
+        ))
+    
+    def search(self, search: str) -> Union[str, Document]:
+        """Look up a document by id (LangChain returns a message string when missing)."""
+        if search in self._added:
+            return self._added[search]
+        
+        row = self._rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        
+        return Document(
+            page_content=self._table.column("text")[row].as_py(),
+            metadata=json.loads(self._table.column("metadata")[row].as_py())
+        )
+    
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Add documents to the in-memory overlay."""
+        overlapping = set(texts).intersection(self._rows, self._added)
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        self._added.update(texts)
+    
+    def delete(self, ids: List) -> None:
+        """Delete documents; saved rows are dropped from the next save."""
+        missing = [doc_id for doc_id in ids if doc_id not in self._rows and doc_id not in self._added]
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not exist: {missing}")
+        
+        for doc_id in ids:
+            self._rows.pop(doc_id, None)
+            self._added.pop(doc_id, None)
+    
+    def save(self, path: Path, index_to_docstore_id: Dict[int, str]):
+        """
+        Write all live documents to an Arrow IPC file.
+        
+        Written to a temp file and renamed into place, so processes that have
+        the previous file memory-mapped keep reading a consistent copy.
+        
+        Args:
+            path: Destination file
+            index_to_docstore_id: FAISS position -> document id mapping to persist
+        """
+        positions = {doc_id: position for position, doc_id in index_to_docstore_id.items()}
+        parts = []
+        
+        if self._rows:
+            saved = self._table.select(["id", "text", "metadata"]).take(
+                pa.array(list(self._rows.values()), type=pa.int64())
+            )
+            parts.append(saved.append_column(
+                "position",
+                pa.array([positions[doc_id] for doc_id in self._rows], type=pa.int64())
+            ))
+        
+        if self._added:
+            parts.append(pa.table({
+                "id": list(self._added),
+                "text": [doc.page_content for doc in self._added.values()],
+                "metadata": [json.dumps(doc.metadata, default=str) for doc in self._added.values()],
+                "position": pa.array([positions[doc_id] for doc_id in self._added], type=pa.int64())
+            }))
+        
+        if parts:
+            table = pa.concat_tables(parts)
+        else:
+            table = pa.table({
+                "id": pa.array([], pa.string()),
+                "text": pa.array([], pa.string()),
+                "metadata": pa.array([], pa.string()),
+                "position": pa.array([], pa.int64())
+            })
+        
+        tmp_path = path.with_name(path.name + ".tmp")
+        feather.write_feather(table, str(tmp_path), compression="uncompressed")
+        os.replace(tmp_path, path)
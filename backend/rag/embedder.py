@@ -2,17 +2,27 @@
 Embedding generation using Gemini Embeddings API and FAISS storage.
 """
 
+import asyncio
+import hashlib
+import json
 import logging
 import pickle
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import faiss
 import numpy as np
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 from core.config import settings
+from rag.embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
@@ -30,15 +40,30 @@ class Embedder:
             model=settings.GEMINI_EMBEDDING_MODEL
         )
         self.vectorstore: Optional[FAISS] = None
+        self._query_cache: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        # Shared by all concurrent uploads: caps in-flight embedding requests and
+        # serializes vector store writes, which run in worker threads
+        self._embed_semaphore = asyncio.Semaphore(settings.EMBED_CONCURRENCY)
+        self._add_lock = asyncio.Lock()
         self.vectorstore_path = Path(settings.VECTOR_STORE_PATH)
         self.vectorstore_path.mkdir(parents=True, exist_ok=True)
+        self.embedding_cache = EmbeddingCache(
+            self.vectorstore_path / "embcache.db",
+            settings.GEMINI_EMBEDDING_MODEL
+        )
     
-    def create_vectorstore(self, documents: List[Document]) -> FAISS:
+    def create_vectorstore(
+        self,
+        documents: List[Document],
+        vectors: Optional[np.ndarray] = None
+    ) -> FAISS:
         """
         Create a FAISS vector store from documents.
         
         Args:
             documents: List of Document objects to embed
+            vectors: Precomputed embeddings for the documents (embedded here if None)
             
         Returns:
             FAISS vector store
@@ -46,10 +71,17 @@ class Embedder:
         logger.info(f"Creating vector store from {len(documents)} documents...")
         
         try:
-            self.vectorstore = FAISS.from_documents(
-                documents=documents,
-                embedding=self.embeddings
-            )
+            texts = [doc.page_content for doc in documents]
+            metadatas = [doc.metadata for doc in documents]
+            if vectors is None:
+                vectors = self.get_embeddings(texts)
+            
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            if settings.NORMALIZE_EMBEDDINGS:
+                # In place: embedding matrices are freshly stacked, never shared with the cache
+                faiss.normalize_L2(vectors)
+            
+            self.vectorstore = self._wrap_index(self._build_index(vectors), texts, metadatas)
             
             logger.info("Vector store created successfully")
             return self.vectorstore
@@ -58,6 +90,167 @@ class Embedder:
             logger.error(f"Error creating vector store: {str(e)}")
             raise
     
+    def _wrap_index(
+        self,
+        index: faiss.Index,
+        texts: List[str],
+        metadatas: List[dict]
+    ) -> FAISS:
+        """
+        Build a FAISS vector store around an already populated index.
+        
+        Args:
+            index: FAISS index holding the vectors for the texts, in order
+            texts: Chunk texts
+            metadatas: Metadata for the texts
+            
+        Returns:
+            FAISS vector store
+        """
+        ids = [str(uuid.uuid4()) for _ in texts]
+        docstore = InMemoryDocstore({
+            doc_id: Document(page_content=text, metadata=metadata)
+            for doc_id, text, metadata in zip(ids, texts, metadatas)
+        })
+        
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=dict(enumerate(ids)),
+            normalize_L2=settings.NORMALIZE_EMBEDDINGS
+        )
+    
+    def _build_index(self, vectors: np.ndarray) -> faiss.Index:
+        """
+        Build the FAISS index selected by VECTOR_STORE_INDEX_TYPE.
+        
+        Args:
+            vectors: 2-D float32 embedding matrix
+            
+        Returns:
+            Populated FAISS index
+        """
+        index_type = settings.VECTOR_STORE_INDEX_TYPE
+        
+        if index_type == "hnsw":
+            return self._build_hnsw_index(vectors)
+        if index_type == "auto" and len(vectors) > settings.IVFPQ_MIN_VECTORS:
+            return self._build_ivfpq_index(vectors)
+        return self._build_flat_index(vectors)
+    
+    @staticmethod
+    def _scalar_quantizer_type() -> Optional[int]:
+        """ScalarQuantizer type for EMBEDDING_QUANTIZATION, or None for FP32."""
+        quantization = settings.EMBEDDING_QUANTIZATION
+        if quantization == "fp32":
+            return None
+        if quantization == "int8":
+            return faiss.ScalarQuantizer.QT_8bit
+        return faiss.ScalarQuantizer.QT_fp16
+    
+    @staticmethod
+    def _build_hnsw_index(vectors: np.ndarray) -> faiss.Index:
+        """
+        Build an HNSW graph index (L2 metric) stored at EMBEDDING_QUANTIZATION precision.
+        
+        Search is roughly logarithmic in the number of vectors, but HNSW cannot
+        remove vectors, so it only suits stores that are never deleted from.
+        
+        Args:
+            vectors: 2-D float32 embedding matrix
+            
+        Returns:
+            Populated HNSW index
+        """
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        dim = matrix.shape[1]
+        qtype = Embedder._scalar_quantizer_type()
+        
+        if qtype is None:
+            index = faiss.IndexHNSWFlat(dim, settings.HNSW_M)
+        else:
+            # Graph over scalar-quantized codes: distance evaluations read 2-4x fewer bytes
+            index = faiss.IndexHNSWSQ(dim, qtype, settings.HNSW_M)
+            index.train(matrix)
+        
+        index.hnsw.efConstruction = settings.HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = settings.HNSW_EF_SEARCH
+        index.add(matrix)
+        return index
+    
+    @staticmethod
+    def _build_flat_index(vectors: np.ndarray) -> faiss.Index:
+        """
+        Build an exhaustive L2 index stored at EMBEDDING_QUANTIZATION precision.
+        
+        FP16 halves and int8 quarters index memory and scan bandwidth versus FP32
+        while keeping L2 distances (and therefore confidence scores) close.
+        
+        Args:
+            vectors: 2-D float32 embedding matrix
+            
+        Returns:
+            Populated flat or scalar-quantizer index
+        """
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        dim = matrix.shape[1]
+        qtype = Embedder._scalar_quantizer_type()
+        
+        if qtype is None:
+            index = faiss.IndexFlatL2(dim)
+        else:
+            index = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_L2)
+            # int8 learns per-dimension ranges from these vectors; FP16 needs no statistics
+            index.train(matrix)
+        
+        index.add(matrix)
+        return index
+    
+    @staticmethod
+    def _build_ivfpq_index(vectors: np.ndarray) -> faiss.IndexIVFPQ:
+        """
+        Train and fill an IndexIVFPQ with the given vectors.
+        
+        Args:
+            vectors: 2-D float32 embedding matrix
+            
+        Returns:
+            Populated IVFPQ index with nprobe set
+        """
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        count, dim = matrix.shape
+        
+        nlist = min(4096, int(4 * np.sqrt(count)))
+        # Number of sub-quantizers must divide the embedding dimension
+        m = next(m for m in (64, 48, 32, 16, 8, 4, 2, 1) if dim % m == 0)
+        
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, 8)
+        index.train(matrix)
+        index.add(matrix)
+        index.nprobe = settings.IVFPQ_NPROBE
+        
+        logger.info(f"Built IVFPQ index (nlist={nlist}, m={m}) for {count} vectors")
+        return index
+    
+    def _maybe_upgrade_index(self):
+        """
+        Re-index an exhaustive vector store as IVFPQ once it grows past IVFPQ_MIN_VECTORS.
+        
+        Vectors are reconstructed from the current index, so nothing is re-embedded,
+        and positions are kept so the docstore mapping stays valid. Safe only because
+        this store is append-only: IVF remove_ids does not compact labels, so
+        FAISS.delete (which renumbers the docstore mapping) would corrupt it.
+        """
+        index = self.vectorstore.index
+        if settings.VECTOR_STORE_INDEX_TYPE != "auto":
+            return
+        if isinstance(index, faiss.IndexIVF) or index.ntotal <= settings.IVFPQ_MIN_VECTORS:
+            return
+        
+        self.vectorstore.index = self._build_ivfpq_index(index.reconstruct_n(0, index.ntotal))
+    
     def save_vectorstore(self, vectorstore: Optional[FAISS] = None):
         """
         Save the vector store to disk.
@@ -71,17 +264,81 @@ class Embedder:
             raise ValueError("No vector store to save")
         
         try:
-            store.save_local(str(self.vectorstore_path))
+            if settings.DOCSTORE_FORMAT == "arrow":
+                self._save_arrow(store)
+            else:
+                self._save_pickle(store)
+            self._write_store_info(store)
             logger.info(f"Vector store saved to {self.vectorstore_path}")
             
         except Exception as e:
             logger.error(f"Error saving vector store: {str(e)}")
             raise
     
-    def load_vectorstore(self) -> FAISS:
+    def _write_index(self, index: faiss.Index):
+        """
+        Write the index next to the docstore.
+        
+        Renamed into place rather than overwritten: query workers memory-map
+        the previous file, and truncating it under them would fault their reads.
+        """
+        tmp_path = self.vectorstore_path / "index.faiss.tmp"
+        faiss.write_index(index, str(tmp_path))
+        tmp_path.replace(self.vectorstore_path / "index.faiss")
+    
+    def _write_store_info(self, store: FAISS):
+        """Record how the stored vectors were built, so a later load searches them the same way."""
+        tmp_path = self.vectorstore_path / "store.json.tmp"
+        tmp_path.write_text(json.dumps({"normalize_L2": store._normalize_L2}))
+        tmp_path.replace(self.vectorstore_path / "store.json")
+    
+    def _stored_normalization(self) -> bool:
+        """
+        Whether the vectors on disk are L2-normalized.
+        
+        Stores saved before this was recorded hold raw vectors. A store keeps its
+        saved normalization until it is rebuilt, whatever NORMALIZE_EMBEDDINGS says:
+        mixing unit and raw vectors in one index would corrupt L2 rankings.
+        """
+        info_path = self.vectorstore_path / "store.json"
+        normalize = json.loads(info_path.read_text())["normalize_L2"] if info_path.exists() else False
+        
+        if normalize != settings.NORMALIZE_EMBEDDINGS:
+            logger.warning(
+                f"Vector store was built with normalize_L2={normalize}; keeping it until the "
+                f"store is rebuilt (NORMALIZE_EMBEDDINGS={settings.NORMALIZE_EMBEDDINGS})"
+            )
+        return normalize
+    
+    def _save_pickle(self, store: FAISS):
+        """Write the same files as FAISS.save_local, each swapped in atomically."""
+        self._write_index(store.index)
+        
+        tmp_path = self.vectorstore_path / "index.pkl.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((store.docstore, store.index_to_docstore_id), f)
+        tmp_path.replace(self.vectorstore_path / "index.pkl")
+    
+    def _save_arrow(self, store: FAISS):
+        """Write the raw index and an Arrow docstore instead of a pickle."""
+        from rag.arrow_docstore import ArrowDocstore
+        
+        if not isinstance(store.docstore, ArrowDocstore):
+            docstore = ArrowDocstore()
+            docstore.add(store.docstore._dict)
+            store.docstore = docstore
+        
+        self._write_index(store.index)
+        store.docstore.save(self.vectorstore_path / "docstore.arrow", store.index_to_docstore_id)
+    
+    def load_vectorstore(self, mmap: bool = False) -> FAISS:
         """
         Load the vector store from disk.
         
+        Args:
+            mmap: Memory-map the index read-only so it is paged in on demand.
+                Only for stores that are searched, never added to or deleted from.
+        
         Returns:
             FAISS vector store
         """
@@ -93,12 +350,48 @@ class Embedder:
                 "Please create the knowledge base first."
             )
         
+        arrow_path = self.vectorstore_path / "docstore.arrow"
+        
         try:
-            self.vectorstore = FAISS.load_local(
-                str(self.vectorstore_path),
-                self.embeddings,
-                allow_dangerous_deserialization=True
-            )
+            normalize = self._stored_normalization()
+            if settings.DOCSTORE_FORMAT == "arrow" and arrow_path.exists():
+                from rag.arrow_docstore import ArrowDocstore
+                
+                if mmap:
+                    index = faiss.read_index(
+                        str(index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                    )
+                else:
+                    index = faiss.read_index(str(index_path))
+                docstore = ArrowDocstore.load(arrow_path)
+                self.vectorstore = FAISS(
+                    embedding_function=self.embeddings,
+                    index=index,
+                    docstore=docstore,
+                    index_to_docstore_id=docstore.index_to_docstore_id(),
+                    normalize_L2=normalize
+                )
+            elif mmap:
+                index = faiss.read_index(
+                    str(index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                )
+                # Same layout FAISS.save_local writes next to the index
+                with open(self.vectorstore_path / "index.pkl", "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+                self.vectorstore = FAISS(
+                    embedding_function=self.embeddings,
+                    index=index,
+                    docstore=docstore,
+                    index_to_docstore_id=index_to_docstore_id,
+                    normalize_L2=normalize
+                )
+            else:
+                self.vectorstore = FAISS.load_local(
+                    str(self.vectorstore_path),
+                    self.embeddings,
+                    allow_dangerous_deserialization=True,
+                    normalize_L2=normalize
+                )
             logger.info("Vector store loaded successfully")
             return self.vectorstore
             
@@ -106,37 +399,216 @@ class Embedder:
             logger.error(f"Error loading vector store: {str(e)}")
             raise
     
-    def add_documents(self, documents: List[Document]):
+    def add_documents(self, documents: List[Document], vectors: Optional[np.ndarray] = None) -> int:
         """
         Add new documents to existing vector store.
         
         Args:
             documents: List of Document objects to add
+            vectors: Precomputed embeddings for the documents (embedded here if None)
+            
+        Returns:
+            Number of documents added (near-duplicates of stored chunks are skipped)
         """
         if self.vectorstore is None:
             try:
                 self.vectorstore = self.load_vectorstore()
             except FileNotFoundError:
                 # Create new vector store if it doesn't exist
-                self.vectorstore = self.create_vectorstore(documents)
-                return
+                self.vectorstore = self.create_vectorstore(documents, vectors)
+                return len(documents)
         
         try:
-            self.vectorstore.add_documents(documents)
-            logger.info(f"Added {len(documents)} documents to vector store")
+            texts = [doc.page_content for doc in documents]
+            metadatas = [doc.metadata for doc in documents]
+            if vectors is None:
+                vectors = self.get_embeddings(texts)
+            
+            keep = self._novel_mask(vectors)
+            if not keep.all():
+                texts = [text for text, k in zip(texts, keep) if k]
+                metadatas = [metadata for metadata, k in zip(metadatas, keep) if k]
+                vectors = vectors[keep]
+                logger.info(f"Skipped {int((~keep).sum())} near-duplicate chunks")
+            
+            if texts:
+                self.vectorstore.add_embeddings(
+                    text_embeddings=list(zip(texts, vectors)),
+                    metadatas=metadatas
+                )
+                self._maybe_upgrade_index()
+            logger.info(f"Added {len(texts)} documents to vector store")
+            return len(texts)
         except Exception as e:
             logger.error(f"Error adding documents: {str(e)}")
             raise
     
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def _novel_mask(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Mark the vectors that are not near-duplicates of a chunk already in the store.
+        
+        A vector is a near-duplicate when its nearest stored neighbour has cosine
+        similarity >= NEAR_DUPLICATE_SIMILARITY. Only applies to normalized stores,
+        where squared L2 distance d relates to cosine as d = 2 - 2cos.
+        
+        Args:
+            vectors: 2-D float32 embedding matrix of the candidate chunks
+            
+        Returns:
+            Boolean mask, True for vectors to add
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        index = self.vectorstore.index
+        threshold = settings.NEAR_DUPLICATE_SIMILARITY
+        
+        if threshold <= 0 or not self.vectorstore._normalize_L2 or index.ntotal == 0:
+            return np.ones(len(vectors), dtype=bool)
+        
+        queries = np.array(vectors, dtype=np.float32)
+        faiss.normalize_L2(queries)
+        distances, ids = index.search(queries, 1)
+        
+        return (ids[:, 0] < 0) | (distances[:, 0] > 2.0 - 2.0 * threshold)
+    
+    async def aadd_documents(self, documents: List[Document]) -> int:
+        """
+        Add new documents to the vector store, embedding them concurrently.
+        
+        Args:
+            documents: List of Document objects to add
+            
+        Returns:
+            Number of documents added (near-duplicates of stored chunks are skipped)
+        """
+        vectors = await self.aget_embeddings([doc.page_content for doc in documents])
+        
+        # Index updates (and IVFPQ re-training) are CPU-bound: keep them off the event loop
+        async with self._add_lock:
+            return await asyncio.to_thread(self.add_documents, documents, vectors)
+    
+    async def asave_vectorstore(self):
+        """
+        Save the vector store without blocking the event loop.
+        
+        Holds the same lock as aadd_documents, so the index and docstore are
+        never written while another upload is still changing them.
+        """
+        async with self._add_lock:
+            await asyncio.to_thread(self.save_vectorstore)
+    
+    def _partition_cached(self, texts: List[str]) -> Tuple[List[bytes], Dict, Dict]:
+        """Split texts into cached embeddings and distinct misses (hash -> text)."""
+        hashes = [EmbeddingCache.key(text) for text in texts]
+        cached = self.embedding_cache.get_many(hashes)
+        
+        # Embed each distinct missing text once
+        misses = {}
+        for text, h in zip(texts, hashes):
+            if h not in cached and h not in misses:
+                misses[h] = text
+        
+        return hashes, cached, misses
+    
+    def _merge_embeddings(
+        self,
+        hashes: List[bytes],
+        cached: Dict,
+        misses: Dict,
+        new_vectors: List[List[float]]
+    ) -> np.ndarray:
+        """Store freshly embedded misses and stack all vectors in input order."""
+        if misses:
+            fresh = list(zip(misses.keys(), np.asarray(new_vectors, dtype=np.float32)))
+            self.embedding_cache.put_many(fresh)
+            cached.update(fresh)
+        
+        logger.info(f"Embedded {len(misses)} of {len(hashes)} texts ({len(hashes) - len(misses)} cached)")
+        return np.vstack([cached[h] for h in hashes]) if hashes else np.empty((0, 0), dtype=np.float32)
+    
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Get embeddings for a list of texts.
         
+        Texts embedded before (same content, same model) are served from the
+        persistent embedding cache; only the misses are sent to Gemini, in
+        EMBED_BATCH_SIZE batches with at most EMBED_CONCURRENCY in flight.
+        
         Args:
             texts: List of text strings
             
         Returns:
-            List of embedding vectors
+            2-D float32 array of embedding vectors, in input order
         """
-        return self.embeddings.embed_documents(texts)
-
+        hashes, cached, misses = self._partition_cached(texts)
+        
+        miss_texts = list(misses.values())
+        batch_size = settings.EMBED_BATCH_SIZE
+        batches = [miss_texts[i:i + batch_size] for i in range(0, len(miss_texts), batch_size)]
+        
+        if len(batches) <= 1:
+            new_vectors = list(chain.from_iterable(map(self.embeddings.embed_documents, batches)))
+        else:
+            # Network-bound calls: threads overlap their latency; map keeps batch order
+            with ThreadPoolExecutor(max_workers=min(settings.EMBED_CONCURRENCY, len(batches))) as pool:
+                new_vectors = list(chain.from_iterable(pool.map(self.embeddings.embed_documents, batches)))
+        
+        return self._merge_embeddings(hashes, cached, misses, new_vectors)
+    
+    async def aget_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Get embeddings for a list of texts without blocking the event loop.
+        
+        Cache misses are split into EMBED_BATCH_SIZE batches embedded concurrently,
+        at most EMBED_CONCURRENCY at a time across all callers.
+        
+        Args:
+            texts: List of text strings
+            
+        Returns:
+            2-D float32 array of embedding vectors, in input order
+        """
+        hashes, cached, misses = await asyncio.to_thread(self._partition_cached, texts)
+        
+        miss_texts = list(misses.values())
+        batch_size = settings.EMBED_BATCH_SIZE
+        
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with self._embed_semaphore:
+                return await self.embeddings.aembed_documents(batch)
+        
+        results = await asyncio.gather(*(
+            embed_batch(miss_texts[i:i + batch_size])
+            for i in range(0, len(miss_texts), batch_size)
+        ))
+        new_vectors = list(chain.from_iterable(results))
+        
+        return await asyncio.to_thread(self._merge_embeddings, hashes, cached, misses, new_vectors)
+    
+    def embed_query_cached(self, query: str) -> List[float]:
+        """
+        Embed a query, reusing the embedding of a previously seen identical query.
+        
+        Keyed on the stripped, lower-cased query; the cache is a bounded LRU.
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            Embedding vector
+        """
+        query = query.strip()
+        key = hashlib.blake2b(query.lower().encode("utf-8"), digest_size=16).digest()
+        
+        with self._query_cache_lock:
+            if key in self._query_cache:
+                self._query_cache.move_to_end(key)
+                return self._query_cache[key]
+        
+        embedding = self.embeddings.embed_query(query)
+        
+        with self._query_cache_lock:
+            self._query_cache[key] = embedding
+            if len(self._query_cache) > settings.QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        
+        return embedding
@@ -2,17 +2,40 @@
 RAG generator using Gemini for answer generation.
 """
 
+import asyncio
 import logging
 import re
-from typing import Dict, List
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Tuple
 from datetime import datetime
 import google.generativeai as genai
+import numpy as np
 
 from core.config import settings
 from rag.retriever import Retriever
 
 logger = logging.getLogger(__name__)
 
+# Word tokenizer for keyword overlap scoring
+_WORD_RE = re.compile(r'\b\w+\b')
+
+
+@lru_cache(maxsize=4096)
+def _content_words(text: str) -> frozenset:
+    """Lower-cased word set of a chunk, cached because the same chunks are retrieved repeatedly."""
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
+# genai.list_models() is a network call whose answer changes rarely
+MODEL_DETECTION_TTL = 24 * 60 * 60
+
+
+@lru_cache(maxsize=1)
+def _latest_model(api_key: str, ttl_bucket: int) -> str:
+    """Memoized model detection, keyed on the API key; ttl_bucket advances once per MODEL_DETECTION_TTL."""
+    return Generator._detect_latest_model()
+
 
 class Generator:
     """Handles RAG pipeline and answer generation using Gemini."""
@@ -72,6 +95,11 @@ SOURCES: [List all sources used from the documents]
         self.retriever = retriever
     
     def _get_latest_model(self) -> str:
+        """Latest available model; detection runs at most once per MODEL_DETECTION_TTL per process."""
+        return _latest_model(settings.GEMINI_API_KEY, int(time.time() // MODEL_DETECTION_TTL))
+    
+    @staticmethod
+    def _detect_latest_model() -> str:
         """Dynamically detect the latest available Gemini model."""
         try:
             models = genai.list_models()
@@ -109,6 +137,114 @@ SOURCES: [List all sources used from the documents]
             logger.warning(f"Error detecting latest model: {str(e)}. Using fallback.")
             return "gemini-pro"
     
+    def _prepare_answer(self, question: str, explain_like_10: bool, top_k: int) -> Dict:
+        """
+        Retrieve context for a question and score it; everything except the LLM call.
+        
+        Returns:
+            Either a final 'result' dictionary (nothing retrieved), or the 'prompt',
+            'sources', 'confidence_score', 'confidence_breakdown' and 'similarity_scores'
+            to build the answer from
+        """
+        retrieved_docs_with_scores = self.retriever.retrieve_with_scores(question, k=top_k)
+        
+        if not retrieved_docs_with_scores:
+            return {
+                'result': {
+                    'answer': "I couldn't find any relevant information in the knowledge base. Please make sure documents have been uploaded and processed.",
+                    'sources': [],
+                    'confidence_score': 0.0,
+                    'similarity_scores': []
+                }
+            }
+        
+        retrieved_docs = [doc for doc, score in retrieved_docs_with_scores]
+        distances = np.asarray([score for doc, score in retrieved_docs_with_scores], dtype=np.float32)
+        # Distance -> similarity for all scores in one pass, reused below
+        similarities = 1.0 - distances / 2.0
+        
+        confidence_score, confidence_breakdown = self._score_confidence(
+            question, retrieved_docs, distances, similarities
+        )
+        
+        # Format context for the prompt
+        context = self.retriever.format_context(retrieved_docs)
+        prompt = self.RAG_PROMPT_TEMPLATE.format(
+            question=question,
+            context=context,
+            explain_mode="Yes" if explain_like_10 else "No"
+        )
+        
+        # One tolist() boxes all similarities as floats
+        similarity_list = similarities.tolist()
+        
+        # Add similarity scores to sources
+        sources = self.retriever.get_source_metadata(retrieved_docs)
+        for source, similarity in zip(sources, similarity_list):
+            source['similarity_score'] = similarity
+        
+        return {
+            'prompt': prompt,
+            'sources': sources,
+            'confidence_score': confidence_score,
+            'confidence_breakdown': confidence_breakdown,
+            'similarity_scores': similarity_list
+        }
+    
+    @staticmethod
+    def _score_confidence(question: str, retrieved_docs: List, distances: np.ndarray, similarities: np.ndarray):
+        """
+        Combine similarity, consistency and keyword overlap into a confidence score.
+        
+        Returns:
+            Tuple of (confidence score, confidence breakdown dictionary)
+        """
+        if len(distances) == 1:
+            # Single chunk (top_k=1): best and average coincide and there is no spread
+            best_similarity = avg_similarity = max(0.0, float(similarities[0]))
+            consistency = 1.0
+        else:
+            # Clamp after reducing, not per element, so the average matches the distance-based formula
+            best_similarity = max(0.0, float(similarities.max()))
+            avg_similarity = max(0.0, float(similarities.mean()))
+            variance = float(distances.var())
+            consistency = 1.0 / (1.0 + variance)
+        
+        query_words = set(_WORD_RE.findall(question.lower()))
+        keyword_matches = 0
+        if query_words:
+            for doc in retrieved_docs:
+                matches = len(query_words.intersection(_content_words(doc.page_content)))
+                keyword_matches += matches / len(query_words)
+        
+        keyword_boost = min(1.0, keyword_matches / len(retrieved_docs)) if retrieved_docs else 0.0
+        
+        confidence_score = (
+            0.5 * best_similarity +
+            0.3 * avg_similarity +
+            0.1 * consistency +
+            0.1 * keyword_boost
+        )
+        
+        confidence_score = confidence_score ** 0.9
+        confidence_score = max(0.0, min(1.0, confidence_score))
+        
+        confidence_breakdown = {
+            'best_similarity': best_similarity,
+            'avg_similarity': avg_similarity,
+            'consistency': consistency,
+            'keyword_match': keyword_boost,
+            'final_score': confidence_score
+        }
+        return confidence_score, confidence_breakdown
+    
+    def _generation_config(self):
+        """Sampling settings shared by the blocking and streaming calls."""
+        return genai.types.GenerationConfig(
+            temperature=settings.TEMPERATURE,
+            max_output_tokens=settings.MAX_TOKENS
+        )
+    
     def generate_answer(self, question: str, explain_like_10: bool = False, top_k: int = None) -> Dict:
         """
         Generate an answer using RAG pipeline.
@@ -133,98 +269,137 @@ SOURCES: [List all sources used from the documents]
             }
         
         try:
-            retrieved_docs_with_scores = self.retriever.retrieve_with_scores(question, k=top_k)
-            
-            if not retrieved_docs_with_scores:
-                return {
-                    'answer': "I couldn't find any relevant information in the knowledge base. Please make sure documents have been uploaded and processed.",
-                    'sources': [],
-                    'confidence_score': 0.0,
-                    'similarity_scores': []
-                }
+            prepared = self._prepare_answer(question, explain_like_10, top_k)
+            if 'result' in prepared:
+                return prepared['result']
             
-            retrieved_docs = [doc for doc, score in retrieved_docs_with_scores]
-            similarity_scores = [score for doc, score in retrieved_docs_with_scores]
+            response = self.model.generate_content(
+                prepared.pop('prompt'),
+                generation_config=self._generation_config()
+            )
             
-            # Calculate confidence score
-            confidence_score = 0.0
-            confidence_breakdown = None
+            return {
+                'answer': self._extract_answer(response.text),
+                **prepared,
+                'query': question,
+                'timestamp': datetime.utcnow(),
+                'explain_mode': explain_like_10
+            }
             
-            if similarity_scores:
-                best_distance = min(similarity_scores)
-                avg_distance = sum(similarity_scores) / len(similarity_scores)
-                
-                best_similarity = max(0.0, 1.0 - (best_distance / 2.0))
-                avg_similarity = max(0.0, 1.0 - (avg_distance / 2.0))
-                
-                if len(similarity_scores) > 1:
-                    variance = sum((s - avg_distance) ** 2 for s in similarity_scores) / len(similarity_scores)
-                    consistency = 1.0 / (1.0 + variance)
-                else:
-                    consistency = 1.0
-                
-                query_lower = question.lower()
-                keyword_matches = 0
-                for doc in retrieved_docs:
-                    content_lower = doc.page_content.lower()
-                    query_words = set(re.findall(r'\b\w+\b', query_lower))
-                    content_words = set(re.findall(r'\b\w+\b', content_lower))
-                    matches = len(query_words.intersection(content_words))
-                    if matches > 0:
-                        keyword_matches += matches / len(query_words) if query_words else 0
-                
-                keyword_boost = min(1.0, keyword_matches / len(retrieved_docs)) if retrieved_docs else 0.0
-                
-                confidence_score = (
-                    0.5 * best_similarity +
-                    0.3 * avg_similarity +
-                    0.1 * consistency +
-                    0.1 * keyword_boost
-                )
-                
-                confidence_score = confidence_score ** 0.9
-                confidence_score = max(0.0, min(1.0, confidence_score))
-                
-                confidence_breakdown = {
-                    'best_similarity': best_similarity,
-                    'avg_similarity': avg_similarity,
-                    'consistency': consistency,
-                    'keyword_match': keyword_boost,
-                    'final_score': confidence_score
-                }
+        except Exception as e:
+            logger.error(f"Error generating answer: {str(e)}")
+            return {
+                'answer': f"An error occurred while generating the answer: {str(e)}",
+                'sources': [],
+                'confidence_score': 0.0,
+                'similarity_scores': []
+            }
+    
+    async def agenerate_answer(self, question: str, explain_like_10: bool = False, top_k: int = None) -> Dict:
+        """
+        Generate an answer without blocking the event loop (same result as generate_answer).
+        
+        Args:
+            question: User question
+            explain_like_10: Whether to simplify the explanation
+            top_k: Number of chunks to retrieve
             
-            # Format context and generate answer
-            context = self.retriever.format_context(retrieved_docs)
+        Returns:
+            Dictionary with answer, sources, confidence score, etc.
+        """
+        if top_k is None:
+            top_k = settings.TOP_K_CHUNKS
+        
+        if not question or not question.strip():
+            return {
+                'answer': "Please provide a valid question.",
+                'sources': [],
+                'confidence_score': 0.0,
+                'similarity_scores': []
+            }
+        
+        try:
+            # Retrieval embeds the query and searches FAISS; keep it off the event loop
+            prepared = await asyncio.to_thread(self._prepare_answer, question, explain_like_10, top_k)
+            if 'result' in prepared:
+                return prepared['result']
             
-            prompt = self.RAG_PROMPT_TEMPLATE.format(
-                question=question,
-                context=context,
-                explain_mode="Yes" if explain_like_10 else "No"
+            response = await self.model.generate_content_async(
+                prepared.pop('prompt'),
+                generation_config=self._generation_config()
             )
             
-            response = self.model.generate_content(
+            return {
+                'answer': self._extract_answer(response.text),
+                **prepared,
+                'query': question,
+                'timestamp': datetime.utcnow(),
+                'explain_mode': explain_like_10
+            }
+            
+        except Exception as e:
+            logger.error(f"Error generating answer: {str(e)}")
+            return {
+                'answer': f"An error occurred while generating the answer: {str(e)}",
+                'sources': [],
+                'confidence_score': 0.0,
+                'similarity_scores': []
+            }
+    
+    async def agenerate_answer_stream(
+        self,
+        question: str,
+        explain_like_10: bool = False,
+        top_k: int = None
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Generate an answer, streaming the model output as it arrives.
+        
+        Yields (event, data) pairs: one 'sources' event with the sources and
+        confidence, 'token' events with answer text deltas (the ANSWER:/SOURCES:
+        framing removed), then one 'done' event with the complete result (same
+        shape as generate_answer).
+        
+        Args:
+            question: User question
+            explain_like_10: Whether to simplify the explanation
+            top_k: Number of chunks to retrieve
+        """
+        if top_k is None:
+            top_k = settings.TOP_K_CHUNKS
+        
+        if not question or not question.strip():
+            yield 'done', {
+                'answer': "Please provide a valid question.",
+                'sources': [],
+                'confidence_score': 0.0,
+                'similarity_scores': []
+            }
+            return
+        
+        try:
+            # Retrieval embeds the query and searches FAISS; keep it off the event loop
+            prepared = await asyncio.to_thread(self._prepare_answer, question, explain_like_10, top_k)
+            if 'result' in prepared:
+                yield 'done', prepared['result']
+                return
+            
+            prompt = prepared.pop('prompt')
+            yield 'sources', prepared
+            
+            response = await self.model.generate_content_async(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=settings.TEMPERATURE,
-                    max_output_tokens=settings.MAX_TOKENS
-                )
+                generation_config=self._generation_config(),
+                stream=True
             )
             
-            answer_text = response.text
-            answer = self._extract_answer(answer_text)
-            sources = self.retriever.get_source_metadata(retrieved_docs)
+            parts = []
+            async for text in self._stream_answer(response, parts):
+                yield 'token', text
             
-            # Add similarity scores to sources
-            for i, source in enumerate(sources):
-                if i < len(similarity_scores):
-                    source['similarity_score'] = float(1.0 - (similarity_scores[i] / 2.0))
-            
-            return {
-                'answer': answer,
-                'sources': sources,
-                'confidence_score': confidence_score,
-                'confidence_breakdown': confidence_breakdown,
-                'similarity_scores': [float(1.0 - (s / 2.0)) for s in similarity_scores],
+            yield 'done', {
+                'answer': self._extract_answer("".join(parts)),
+                **prepared,
                 'query': question,
                 'timestamp': datetime.utcnow(),
                 'explain_mode': explain_like_10
@@ -232,13 +407,69 @@ SOURCES: [List all sources used from the documents]
             
         except Exception as e:
             logger.error(f"Error generating answer: {str(e)}")
-            return {
+            yield 'done', {
                 'answer': f"An error occurred while generating the answer: {str(e)}",
                 'sources': [],
                 'confidence_score': 0.0,
                 'similarity_scores': []
             }
     
+    async def _stream_answer(self, response, raw_parts: List[str]) -> AsyncIterator[str]:
+        """
+        Yield answer text from a streamed response, dropping the ANSWER:/SOURCES: framing.
+        
+        Args:
+            response: Streamed model response
+            raw_parts: Receives the unfiltered text of every chunk
+        """
+        answer_marker = "ANSWER:"
+        sources_marker = "SOURCES:"
+        pending = ""
+        started = False
+        emitted = False
+        finished = False
+        
+        async for chunk in response:
+            text = chunk.text
+            if not text:
+                continue
+            raw_parts.append(text)
+            if finished:
+                continue
+            
+            pending += text
+            if not started:
+                stripped = pending.lstrip()
+                # Wait until we can tell whether the answer starts with the marker
+                if answer_marker.startswith(stripped):
+                    continue
+                if stripped.startswith(answer_marker):
+                    stripped = stripped[len(answer_marker):]
+                pending = stripped
+                started = True
+            if not emitted:
+                # Like _extract_answer, the answer starts at its first non-blank character
+                pending = pending.lstrip()
+            
+            if sources_marker in pending:
+                answer_tail = pending.split(sources_marker, 1)[0].rstrip()
+                if answer_tail:
+                    yield answer_tail
+                pending = ""
+                finished = True
+                continue
+            
+            # Hold back a tail that could be the start of the sources marker, and
+            # trailing whitespace that may turn out to precede it
+            safe = min(len(pending) - (len(sources_marker) - 1), len(pending.rstrip()))
+            if safe > 0:
+                yield pending[:safe]
+                pending = pending[safe:]
+                emitted = True
+        
+        if not finished and pending.rstrip():
+            yield pending.rstrip()
+    
     def _extract_answer(self, response_text: str) -> str:
         """Extract answer from response text."""
         if "ANSWER:" in response_text:
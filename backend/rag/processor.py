@@ -17,7 +17,14 @@ logger = logging.getLogger(__name__)
 class DocumentProcessor:
     """Handles document loading and chunking."""
     
-    SUPPORTED_EXTENSIONS = {'.pdf', '.docx', '.doc', '.txt'}
+    # Loader factory per extension
+    LOADERS = {
+        '.pdf': PyPDFLoader,
+        '.docx': Docx2txtLoader,
+        '.doc': Docx2txtLoader,
+        '.txt': lambda path: TextLoader(path, encoding='utf-8'),
+    }
+    SUPPORTED_EXTENSIONS = frozenset(LOADERS)
     
     def __init__(self):
         """Initialize document processor."""
@@ -52,15 +59,7 @@ class DocumentProcessor:
             )
         
         try:
-            if extension == '.pdf':
-                loader = PyPDFLoader(str(file_path))
-            elif extension in {'.docx', '.doc'}:
-                loader = Docx2txtLoader(str(file_path))
-            elif extension == '.txt':
-                loader = TextLoader(str(file_path), encoding='utf-8')
-            else:
-                raise ValueError(f"Unsupported extension: {extension}")
-            
+            loader = self.LOADERS[extension](str(file_path))
             documents = loader.load()
             
             # Add source metadata
@@ -2,48 +2,90 @@
 Retriever for searching FAISS vector store and retrieving relevant chunks.
 """
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, TYPE_CHECKING
 import logging
-import re
+import string
+from functools import lru_cache
+import numpy as np
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 
 from core.config import settings
 
+if TYPE_CHECKING:
+    from rag.embedder import Embedder
+
 logger = logging.getLogger(__name__)
 
+# Common stop words dropped from query keywords
+_STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'what', 'which', 'who', 'whom', 'whose', 'where', 'when', 'why', 'how'})
+
+# Punctuation other than hyphens and apostrophes becomes a word break
+_PUNCT_TABLE = str.maketrans({c: ' ' for c in string.punctuation if c not in "-'"})
+
+
+@lru_cache(maxsize=4096)
+def _lowered(text: str) -> str:
+    """Lower-cased chunk text, cached because the same chunks are scored for many queries."""
+    return text.lower()
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first; equal scores keep search order."""
+    if k < len(scores):
+        # O(n) selection, then only the k winners are sorted
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
 
 class Retriever:
     """Handles retrieval of relevant document chunks from vector store."""
     
-    def __init__(self, vectorstore: FAISS):
+    def __init__(self, vectorstore: FAISS, embedder: Optional["Embedder"] = None):
         """
         Initialize retriever with a vector store.
         
         Args:
             vectorstore: FAISS vector store instance
+            embedder: Optional Embedder whose query-embedding cache is used for searches
         """
         self.vectorstore = vectorstore
+        self.embedder = embedder
     
-    def _extract_keywords(self, query: str) -> List[str]:
-        """Extract important keywords from the query."""
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'what', 'which', 'who', 'whom', 'whose', 'where', 'when', 'why', 'how'}
+    def _search_with_score(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """Similarity search, using cached query embeddings when an embedder is set."""
+        if self.embedder is None:
+            return self.vectorstore.similarity_search_with_score(query=query, k=k)
         
-        words = re.findall(r'\b[a-zA-Z0-9\-\']+\b', query.lower())
-        keywords = [w for w in words if w not in stop_words and len(w) > 2]
+        embedding = self.embedder.embed_query_cached(query)
+        return self.vectorstore.similarity_search_with_score_by_vector(embedding, k=k)
+    
+    def query_embedding(self, query: str) -> List[float]:
+        """
+        Embedding that retrieve_with_scores searches with for a query.
         
+        Goes through the embedder's query cache, so a following retrieval for
+        the same query does not call the embedding API again.
+        """
+        return self.embedder.embed_query_cached(self._expand_query(query))
+    
+    def _extract_keywords(self, query: str) -> List[str]:
+        """Extract important keywords from the query (single pass, first occurrence order)."""
+        keywords = []
         seen = set()
-        unique_keywords = []
-        for kw in keywords:
-            if kw not in seen:
-                seen.add(kw)
-                unique_keywords.append(kw)
-        
-        return unique_keywords
+        for word in query.lower().translate(_PUNCT_TABLE).split():
+            word = word.strip("-'")
+            if len(word) > 2 and word not in _STOP_WORDS and word not in seen:
+                seen.add(word)
+                keywords.append(word)
+        return keywords
     
-    def _expand_query(self, query: str) -> str:
-        """Expand query with keywords for better retrieval."""
-        keywords = self._extract_keywords(query)
+    def _expand_query(self, query: str, keywords: Optional[List[str]] = None) -> str:
+        """Expand query with keywords for better retrieval (extracted here if not given)."""
+        if keywords is None:
+            keywords = self._extract_keywords(query)
         if keywords:
             return f"{query} {' '.join(keywords)}"
         return query
@@ -53,8 +95,8 @@ class Retriever:
         if not keywords:
             return 0.0
         
-        content_lower = document.page_content.lower()
-        matches = sum(1 for kw in keywords if kw.lower() in content_lower)
+        content_lower = _lowered(document.page_content)
+        matches = sum(1 for kw in keywords if kw in content_lower)
         return matches / len(keywords) if keywords else 0.0
     
     def retrieve_with_scores(self, query: str, k: int = None) -> List[Tuple[Document, float]]:
@@ -76,35 +118,29 @@ class Retriever:
         
         try:
             keywords = self._extract_keywords(query)
-            retrieve_k = min(k * 3, 20)
-            expanded_query = self._expand_query(query)
+            # Never ask FAISS for more candidates than the index holds
+            retrieve_k = min(k * 3, 20, self.vectorstore.index.ntotal)
+            if retrieve_k == 0:
+                logger.warning("Vector store is empty")
+                return []
             
-            docs_with_scores = self.vectorstore.similarity_search_with_score(
-                query=expanded_query,
-                k=retrieve_k
-            )
-            
-            if not docs_with_scores:
-                docs_with_scores = self.vectorstore.similarity_search_with_score(
-                    query=query,
-                    k=retrieve_k
-                )
+            # One search (and at most one embedding call) per query
+            docs_with_scores = self._search_with_score(self._expand_query(query, keywords), retrieve_k)
             
             if not docs_with_scores:
                 logger.warning(f"No documents retrieved for query: {query[:50]}...")
                 return []
             
-            # Enhance scores with keyword matching
-            enhanced_results = []
-            for doc, distance_score in docs_with_scores:
-                keyword_score = self._calculate_keyword_match_score(doc, keywords)
-                normalized_distance = min(distance_score / 2.0, 1.0) if distance_score > 0 else 0.0
-                similarity_score = 1.0 - normalized_distance
-                combined_score = 0.7 * similarity_score + 0.3 * keyword_score
-                enhanced_results.append((doc, distance_score, combined_score, keyword_score))
+            # Enhance scores with keyword matching (vectorized over all candidates)
+            distances = np.fromiter((score for _, score in docs_with_scores), dtype=np.float32)
+            keyword_scores = np.fromiter(
+                (self._calculate_keyword_match_score(doc, keywords) for doc, _ in docs_with_scores),
+                dtype=np.float32
+            )
+            similarity_scores = 1.0 - np.clip(distances / 2.0, 0.0, 1.0)
+            combined_scores = 0.7 * similarity_scores + 0.3 * keyword_scores
             
-            enhanced_results.sort(key=lambda x: x[2], reverse=True)
-            final_results = [(doc, distance) for doc, distance, combined, _ in enhanced_results[:k]]
+            final_results = [docs_with_scores[i] for i in _top_k(combined_scores, k)]
             
             logger.info(f"Retrieved {len(final_results)} chunks for query: {query[:50]}...")
             return final_results
@@ -112,7 +148,7 @@ class Retriever:
         except Exception as e:
             logger.error(f"Error retrieving documents: {str(e)}")
             try:
-                return self.vectorstore.similarity_search_with_score(query=query, k=k)
+                return self._search_with_score(query, k)
             except:
                 return []
     
@@ -20,6 +20,9 @@ if __name__ == "__main__":
             "app:app",
             host=host,
             port=8000,
+            # Same event loop and HTTP parser as app.py (uvloop has no Windows build)
+            loop="asyncio" if sys.platform == "win32" else "uvloop",
+            http="httptools",
             reload=settings.ENVIRONMENT == "development",
             log_level="info",
             access_log=True
@@ -2,17 +2,42 @@
 MongoDB service for metadata storage.
 """
 
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure
 from typing import Optional, Dict, List
 import logging
 from datetime import datetime
 from bson import ObjectId
+from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
 
 from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Fields returned by list_files / get_chat_history (_id is always included)
+FILE_LIST_FIELDS = {
+    "file_id": 1, "filename": 1, "file_size": 1, "file_type": 1,
+    "s3_key": 1, "created_at": 1, "processed": 1, "chunk_count": 1
+}
+CHAT_HISTORY_FIELDS = {
+    "question": 1, "answer": 1, "confidence_score": 1, "sources_count": 1,
+    "explain_mode": 1, "user_id": 1, "created_at": 1
+}
+
+
+class ObjectIdToStr(TypeDecoder):
+    """Decode ObjectId values as strings while BSON is being decoded."""
+    
+    bson_type = ObjectId
+    
+    def transform_bson(self, value: ObjectId) -> str:
+        return str(value)
+
+
+# Documents come back with string _ids, ready for the JSON response models
+CODEC_OPTIONS = CodecOptions(type_registry=TypeRegistry([ObjectIdToStr()]))
+
 
 class MongoDBService:
     """Service for interacting with MongoDB."""
@@ -21,6 +46,8 @@ class MongoDBService:
         """Initialize MongoDB client."""
         self.client: Optional[AsyncIOMotorClient] = None
         self.db = None
+        self._chat_log_queue: Optional[asyncio.Queue] = None
+        self._chat_log_task: Optional[asyncio.Task] = None
         
         if not settings.MONGODB_URI:
             logger.warning("MongoDB URI not configured. Metadata storage will be unavailable.")
@@ -29,9 +56,10 @@ class MongoDBService:
         try:
             self.client = AsyncIOMotorClient(
                 settings.MONGODB_URI,
-                serverSelectionTimeoutMS=5000
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE
             )
-            self.db = self.client[settings.MONGODB_DB_NAME]
+            self.db = self.client.get_database(settings.MONGODB_DB_NAME, codec_options=CODEC_OPTIONS)
             logger.info(f"Connected to MongoDB: {settings.MONGODB_DB_NAME}")
             
         except Exception as e:
@@ -63,8 +91,9 @@ class MongoDBService:
             return None
         
         try:
-            file_data["created_at"] = datetime.utcnow()
-            file_data["updated_at"] = datetime.utcnow()
+            now = datetime.utcnow()
+            file_data["created_at"] = now
+            file_data["updated_at"] = now
             
             result = await self.db.files.insert_one(file_data)
             return str(result.inserted_id)
@@ -73,16 +102,37 @@ class MongoDBService:
             logger.error(f"Failed to insert file metadata: {str(e)}")
             return None
     
+    async def bulk_insert_file_metadata(self, files: List[Dict]) -> List[str]:
+        """
+        Insert metadata for several files in one round trip.
+        
+        Args:
+            files: File information dictionaries
+            
+        Returns:
+            Inserted document IDs in input order, empty list if error
+        """
+        if not self.db or not files:
+            return []
+        
+        try:
+            now = datetime.utcnow()
+            docs = [{**file_data, "created_at": now, "updated_at": now} for file_data in files]
+            
+            result = await self.db.files.insert_many(docs, ordered=False)
+            return [str(inserted_id) for inserted_id in result.inserted_ids]
+            
+        except Exception as e:
+            logger.error(f"Failed to insert metadata for {len(files)} files: {str(e)}")
+            return []
+    
     async def get_file_metadata(self, file_id: str) -> Optional[Dict]:
         """Get file metadata by ID."""
         if not self.db:
             return None
         
         try:
-            file_doc = await self.db.files.find_one({"_id": ObjectId(file_id)})
-            if file_doc:
-                file_doc["_id"] = str(file_doc["_id"])
-            return file_doc
+            return await self.db.files.find_one({"_id": ObjectId(file_id)})
             
         except Exception as e:
             logger.error(f"Failed to get file metadata: {str(e)}")
@@ -94,28 +144,59 @@ class MongoDBService:
             return None
         
         try:
-            file_doc = await self.db.files.find_one({"s3_key": s3_key})
-            if file_doc:
-                file_doc["_id"] = str(file_doc["_id"])
-            return file_doc
+            return await self.db.files.find_one({"s3_key": s3_key})
             
         except Exception as e:
             logger.error(f"Failed to get file by S3 key: {str(e)}")
             return None
     
+    async def get_processed_file_by_hash(self, sha256: str) -> Optional[Dict]:
+        """Get an already processed file with the same content hash."""
+        if not self.db:
+            return None
+        
+        try:
+            return await self.db.files.find_one({"sha256": sha256, "processed": True})
+            
+        except Exception as e:
+            logger.error(f"Failed to get file by hash: {str(e)}")
+            return None
+    
+    async def create_indexes(self):
+        """Create the indexes behind file lookups, file listing and chat history (no-op if present)."""
+        if not self.db:
+            return
+        
+        indexes = [
+            (self.db.files, [("sha256", 1)], {}),
+            (self.db.files, [("s3_key", 1)], {"unique": True}),
+            (self.db.files, [("created_at", -1)], {}),
+            (self.db.chat_logs, [("created_at", -1)], {}),
+            (self.db.chat_logs, [("user_id", 1), ("created_at", -1)], {}),
+        ]
+        
+        # One at a time, so e.g. duplicate s3_keys in old data don't block the other indexes
+        for collection, keys, options in indexes:
+            try:
+                await collection.create_index(keys, **options)
+            except Exception as e:
+                logger.warning(f"Failed to create index {keys} on {collection.name}: {str(e)}")
+    
     async def list_files(self, skip: int = 0, limit: int = 100) -> List[Dict]:
         """List all files with pagination."""
         if not self.db:
             return []
         
         try:
-            cursor = self.db.files.find().sort("created_at", -1).skip(skip).limit(limit)
-            files = await cursor.to_list(length=limit)
-            
-            for file in files:
-                file["_id"] = str(file["_id"])
-            
-            return files
+            # Only the fields the file listing returns; one batch for the whole page
+            cursor = (
+                self.db.files.find({}, projection=FILE_LIST_FIELDS)
+                .sort("created_at", -1)
+                .skip(skip)
+                .limit(limit)
+                .batch_size(limit)
+            )
+            return await cursor.to_list(length=limit)
             
         except Exception as e:
             logger.error(f"Failed to list files: {str(e)}")
@@ -127,10 +208,10 @@ class MongoDBService:
             return False
         
         try:
-            update_data["updated_at"] = datetime.utcnow()
+            # Server-side timestamp; the caller's dict is left untouched
             result = await self.db.files.update_one(
                 {"_id": ObjectId(file_id)},
-                {"$set": update_data}
+                {"$set": update_data, "$currentDate": {"updated_at": True}}
             )
             return result.modified_count > 0
             
@@ -138,6 +219,30 @@ class MongoDBService:
             logger.error(f"Failed to update file metadata: {str(e)}")
             return False
     
+    async def mark_files_processed(self, file_ids: List[str]) -> int:
+        """
+        Flag several files as processed in one round trip.
+        
+        Args:
+            file_ids: Inserted document IDs
+            
+        Returns:
+            Number of documents modified
+        """
+        if not self.db or not file_ids:
+            return 0
+        
+        try:
+            result = await self.db.files.update_many(
+                {"_id": {"$in": [ObjectId(file_id) for file_id in file_ids]}},
+                {"$set": {"processed": True}, "$currentDate": {"updated_at": True}}
+            )
+            return result.modified_count
+            
+        except Exception as e:
+            logger.error(f"Failed to mark {len(file_ids)} files processed: {str(e)}")
+            return 0
+    
     async def delete_file_metadata(self, file_id: str) -> bool:
         """Delete file metadata."""
         if not self.db:
@@ -165,6 +270,88 @@ class MongoDBService:
             logger.error(f"Failed to insert chat log: {str(e)}")
             return None
     
+    def enqueue_chat_log(self, chat_data: Dict) -> bool:
+        """
+        Queue a chat log entry for the batched writer.
+        
+        Args:
+            chat_data: Chat log entry
+            
+        Returns:
+            True if queued, False if the batched writer is not running
+        """
+        if self._chat_log_queue is None:
+            return False
+        
+        chat_data["created_at"] = datetime.utcnow()
+        self._chat_log_queue.put_nowait(chat_data)
+        return True
+    
+    async def start_chat_log_writer(self):
+        """Start the background task that writes queued chat logs in batches."""
+        if self.db is None or self._chat_log_task is not None:
+            return
+        
+        self._chat_log_queue = asyncio.Queue()
+        self._chat_log_task = asyncio.create_task(self._write_chat_logs())
+    
+    async def stop_chat_log_writer(self):
+        """Stop the batched writer and flush any chat logs still queued."""
+        if self._chat_log_task is None:
+            return
+        
+        self._chat_log_task.cancel()
+        try:
+            await self._chat_log_task
+        except asyncio.CancelledError:
+            pass
+        
+        remaining = []
+        while not self._chat_log_queue.empty():
+            remaining.append(self._chat_log_queue.get_nowait())
+        await self._insert_chat_logs(remaining)
+        
+        self._chat_log_task = None
+        self._chat_log_queue = None
+    
+    async def _write_chat_logs(self):
+        """Drain the chat log queue, inserting up to CHAT_LOG_BATCH_SIZE entries at a time."""
+        loop = asyncio.get_running_loop()
+        batch = []
+        
+        try:
+            while True:
+                batch = [await self._chat_log_queue.get()]
+                deadline = loop.time() + settings.CHAT_LOG_FLUSH_INTERVAL
+                
+                while len(batch) < settings.CHAT_LOG_BATCH_SIZE:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._chat_log_queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                
+                await self._insert_chat_logs(batch)
+                batch = []
+        except asyncio.CancelledError:
+            # Entries already taken off the queue are not flushed by stop_chat_log_writer.
+            # If the insert itself was interrupted, documents that made it carry an _id
+            # and are rejected as duplicates by the unordered insert.
+            await self._insert_chat_logs(batch)
+            raise
+    
+    async def _insert_chat_logs(self, batch: List[Dict]):
+        """Insert a batch of chat logs in one round trip."""
+        if not batch:
+            return
+        
+        try:
+            await self.db.chat_logs.insert_many(batch, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to insert {len(batch)} chat logs: {str(e)}")
+    
     async def get_chat_history(self, user_id: Optional[str] = None, limit: int = 50) -> List[Dict]:
         """Get chat history."""
         if not self.db:
@@ -175,13 +362,13 @@ class MongoDBService:
             if user_id:
                 query["user_id"] = user_id
             
-            cursor = self.db.chat_logs.find(query).sort("created_at", -1).limit(limit)
-            chats = await cursor.to_list(length=limit)
-            
-            for chat in chats:
-                chat["_id"] = str(chat["_id"])
-            
-            return chats
+            cursor = (
+                self.db.chat_logs.find(query, projection=CHAT_HISTORY_FIELDS)
+                .sort("created_at", -1)
+                .limit(limit)
+                .batch_size(limit)
+            )
+            return await cursor.to_list(length=limit)
             
         except Exception as e:
             logger.error(f"Failed to get chat history: {str(e)}")
@@ -0,0 +1,128 @@
+"""
+Semantic cache for query responses.
+Returns a previous answer when a new question is close enough in embedding space.
+"""
+
+import threading
+import time
+from typing import Dict, Hashable, List, Optional
+import logging
+
+import faiss
+import numpy as np
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """Caches query responses keyed by question embeddings using a FAISS inner-product index."""
+    
+    def __init__(
+        self,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = settings.SEMANTIC_CACHE_TTL,
+        max_entries: int = settings.SEMANTIC_CACHE_MAX_ENTRIES
+    ):
+        """
+        Initialize the query cache.
+        
+        Args:
+            threshold: Minimum cosine similarity for a cache hit
+            ttl: Time-to-live of cached entries in seconds
+            max_entries: Entries kept per namespace; the oldest are dropped first
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._namespaces: Dict[Hashable, Dict] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _as_unit_row(embedding: List[float]) -> np.ndarray:
+        """Convert an embedding to a L2-normalized float32 row vector."""
+        vector = np.asarray([embedding], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+    
+    def get(self, embedding: List[float], namespace: Hashable = None) -> Optional[Dict]:
+        """
+        Look up a cached response for a semantically similar question.
+        
+        Args:
+            embedding: Question embedding
+            namespace: Cache partition (e.g. answer mode and top_k)
+        
+        Returns:
+            Cached response dictionary, or None on a miss
+        """
+        vector = self._as_unit_row(embedding)
+        
+        with self._lock:
+            bucket = self._namespaces.get(namespace)
+            if bucket is None or bucket['index'].ntotal == 0:
+                return None
+            
+            scores, ids = bucket['index'].search(vector, 1)
+            score, idx = scores[0][0], ids[0][0]
+            if idx < 0 or score < self.threshold:
+                return None
+            
+            response, created_at = bucket['entries'][idx]
+            if time.time() - created_at > self.ttl:
+                return None
+        
+        logger.info(f"Query cache hit (similarity {score:.3f})")
+        return response
+    
+    def put(self, embedding: List[float], response: Dict, namespace: Hashable = None):
+        """
+        Store a response for a question.
+        
+        Args:
+            embedding: Question embedding
+            response: Response dictionary returned to the client
+            namespace: Cache partition (e.g. answer mode and top_k)
+        """
+        vector = self._as_unit_row(embedding)
+        
+        with self._lock:
+            bucket = self._namespaces.get(namespace)
+            if bucket is None:
+                bucket = {'index': faiss.IndexFlatIP(vector.shape[1]), 'entries': []}
+                self._namespaces[namespace] = bucket
+            
+            now = time.time()
+            entries = bucket['entries']
+            if entries and (now - entries[0][1] > self.ttl or len(entries) >= self.max_entries):
+                self._evict(bucket, now)
+            
+            bucket['index'].add(vector)
+            bucket['entries'].append((response, now))
+    
+    def _evict(self, bucket: Dict, now: float):
+        """Rebuild a namespace index without expired entries; when full, drop the oldest quarter."""
+        live = [
+            i for i, (_, created_at) in enumerate(bucket['entries'])
+            if now - created_at <= self.ttl
+        ]
+        if len(live) >= self.max_entries:
+            live = live[max(1, self.max_entries // 4) + len(live) - self.max_entries:]
+        
+        index = faiss.IndexFlatIP(bucket['index'].d)
+        if live:
+            vectors = bucket['index'].reconstruct_n(0, bucket['index'].ntotal)
+            index.add(vectors[live])
+        
+        bucket['index'] = index
+        bucket['entries'] = [bucket['entries'][i] for i in live]
+    
+    def clear(self):
+        """Drop all cached responses (e.g. after the knowledge base changes)."""
+        with self._lock:
+            self._namespaces.clear()
+
+
+# Global query cache instance
+query_cache = QueryCache()
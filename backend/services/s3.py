@@ -2,9 +2,15 @@
 AWS S3 service for document storage.
 """
 
+import io
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from typing import Optional, BinaryIO
+from typing import Dict, List, Optional, BinaryIO
 import logging
 from pathlib import Path
 import uuid
@@ -20,6 +26,10 @@ class S3Service:
     
     def __init__(self):
         """Initialize S3 client."""
+        # Signed URLs per (key, expiration, time bucket); see get_presigned_url
+        self._signed_url = lru_cache(maxsize=settings.PRESIGNED_URL_CACHE_SIZE)(self._sign_url)
+        self._bucket_checked = False
+        
         if not all([settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.S3_BUCKET_NAME]):
             logger.warning("S3 credentials not configured. File uploads will fail.")
             self.client = None
@@ -35,21 +45,40 @@ class S3Service:
             if settings.S3_ENDPOINT_URL:
                 s3_config["endpoint_url"] = settings.S3_ENDPOINT_URL
             
+            # One client shared by all worker threads (client method calls are thread-safe;
+            # sessions and resources are not). Size its connection pool for every multipart
+            # part of every concurrent upload, so keep-alive connections are reused, not re-opened
+            self.max_connections = settings.MAX_CONCURRENT_UPLOADS * settings.S3_MAX_CONCURRENCY
+            s3_config["config"] = Config(
+                max_pool_connections=self.max_connections,
+                tcp_keepalive=True,
+                retries={"max_attempts": 5, "mode": "adaptive"}
+            )
+            
             self.client = boto3.client("s3", **s3_config)
             self.bucket_name = settings.S3_BUCKET_NAME
-            
-            # Verify bucket exists
-            self._ensure_bucket_exists()
+            self.transfer_config = TransferConfig(
+                multipart_threshold=settings.S3_MULTIPART_CHUNK_SIZE,
+                multipart_chunksize=settings.S3_MULTIPART_CHUNK_SIZE,
+                max_concurrency=settings.S3_MAX_CONCURRENCY,
+                use_threads=True
+            )
             
         except Exception as e:
             logger.error(f"Failed to initialize S3 client: {str(e)}")
             self.client = None
     
     def _ensure_bucket_exists(self):
-        """Ensure the S3 bucket exists, create if it doesn't."""
-        if not self.client:
+        """
+        Ensure the S3 bucket exists, create if it doesn't.
+        
+        Runs once, on the first upload rather than at import, so starting the
+        app (or importing this module offline) makes no S3 request.
+        """
+        if not self.client or self._bucket_checked:
             return
         
+        self._bucket_checked = True
         try:
             self.client.head_bucket(Bucket=self.bucket_name)
             logger.info(f"S3 bucket '{self.bucket_name}' exists")
@@ -65,10 +94,21 @@ class S3Service:
             else:
                 logger.error(f"Error checking S3 bucket: {str(e)}")
     
+    @staticmethod
+    def _new_key(filename: str) -> str:
+        """Generate a unique S3 key for an uploaded document."""
+        file_ext = Path(filename).suffix
+        unique_id = uuid.uuid4().hex[:8]
+        timestamp = datetime.utcnow().strftime("%Y/%m/%d")
+        return f"documents/{timestamp}/{unique_id}{file_ext}"
+    
     def upload_file(self, file_content: bytes, filename: str, content_type: str = "application/octet-stream") -> Optional[str]:
         """
         Upload a file to S3.
         
+        Small files go up in one PUT; from S3_MULTIPART_CHUNK_SIZE on, they are
+        sent as a parallel multipart upload via upload_fileobj.
+        
         Args:
             file_content: File content as bytes
             filename: Original filename
@@ -80,11 +120,12 @@ class S3Service:
         if not self.client:
             raise ValueError("S3 client not initialized. Check AWS credentials.")
         
-        # Generate unique S3 key
-        file_ext = Path(filename).suffix
-        unique_id = uuid.uuid4().hex[:8]
-        timestamp = datetime.utcnow().strftime("%Y/%m/%d")
-        s3_key = f"documents/{timestamp}/{unique_id}{file_ext}"
+        self._ensure_bucket_exists()
+        
+        if len(file_content) >= self.transfer_config.multipart_threshold:
+            return self.upload_fileobj(io.BytesIO(file_content), filename, content_type)
+        
+        s3_key = self._new_key(filename)
         
         try:
             self.client.put_object(
@@ -105,10 +146,55 @@ class S3Service:
             logger.error(f"Failed to upload file to S3: {str(e)}")
             raise
     
+    def upload_fileobj(self, fileobj: BinaryIO, filename: str, content_type: str = "application/octet-stream") -> Optional[str]:
+        """
+        Upload a file object to S3 without reading it into memory.
+        
+        Large files are sent as a multipart upload by boto3's transfer manager.
+        
+        Args:
+            fileobj: Readable binary file object
+            filename: Original filename
+            content_type: MIME type of the file
+            
+        Returns:
+            S3 key (path) if successful, None otherwise
+        """
+        if not self.client:
+            raise ValueError("S3 client not initialized. Check AWS credentials.")
+        
+        self._ensure_bucket_exists()
+        
+        s3_key = self._new_key(filename)
+        
+        try:
+            self.client.upload_fileobj(
+                fileobj,
+                self.bucket_name,
+                s3_key,
+                ExtraArgs={
+                    "ContentType": content_type,
+                    "Metadata": {
+                        "original_filename": filename,
+                        "uploaded_at": datetime.utcnow().isoformat()
+                    }
+                },
+                Config=self.transfer_config
+            )
+            
+            logger.info(f"Uploaded file to S3: {s3_key}")
+            return s3_key
+            
+        except ClientError as e:
+            logger.error(f"Failed to upload file to S3: {str(e)}")
+            raise
+    
     def download_file(self, s3_key: str) -> Optional[bytes]:
         """
         Download a file from S3.
         
+        Large files are fetched as parallel ranged GETs by boto3's transfer manager.
+        
         Args:
             s3_key: S3 key (path) of the file
             
@@ -119,13 +205,67 @@ class S3Service:
             raise ValueError("S3 client not initialized.")
         
         try:
-            response = self.client.get_object(Bucket=self.bucket_name, Key=s3_key)
-            return response["Body"].read()
+            buffer = io.BytesIO()
+            self.client.download_fileobj(self.bucket_name, s3_key, buffer, Config=self.transfer_config)
+            return buffer.getvalue()
             
         except ClientError as e:
             logger.error(f"Failed to download file from S3: {str(e)}")
             return None
     
+    def download_to_file(self, s3_key: str, path: str) -> bool:
+        """
+        Download a file from S3 straight to disk, without holding it in memory.
+        
+        Args:
+            s3_key: S3 key (path) of the file
+            path: Local destination path
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.client:
+            raise ValueError("S3 client not initialized.")
+        
+        try:
+            self.client.download_file(self.bucket_name, s3_key, path, Config=self.transfer_config)
+            return True
+            
+        except ClientError as e:
+            logger.error(f"Failed to download file from S3: {str(e)}")
+            return False
+    
+    def _get_object_bytes(self, s3_key: str) -> Optional[bytes]:
+        """Single GET of a whole object, None if it fails."""
+        try:
+            return self.client.get_object(Bucket=self.bucket_name, Key=s3_key)["Body"].read()
+        except ClientError as e:
+            logger.error(f"Failed to download file from S3: {str(e)}")
+            return None
+    
+    def download_many(self, s3_keys: List[str]) -> Dict[str, Optional[bytes]]:
+        """
+        Download many (typically small) files concurrently over the shared connection pool.
+        
+        Per-request latency dominates small objects, so the GETs are overlapped
+        rather than issued one after another.
+        
+        Args:
+            s3_keys: S3 keys (paths) of the files
+            
+        Returns:
+            Mapping of S3 key to file content, None for files that failed
+        """
+        if not self.client:
+            raise ValueError("S3 client not initialized.")
+        
+        unique_keys = list(dict.fromkeys(s3_keys))
+        if not unique_keys:
+            return {}
+        
+        with ThreadPoolExecutor(max_workers=min(len(unique_keys), self.max_connections)) as pool:
+            return dict(zip(unique_keys, pool.map(self._get_object_bytes, unique_keys)))
+    
     def delete_file(self, s3_key: str) -> bool:
         """
         Delete a file from S3.
@@ -148,10 +288,22 @@ class S3Service:
             logger.error(f"Failed to delete file from S3: {str(e)}")
             return False
     
+    def _sign_url(self, s3_key: str, expiration: int, time_bucket: int) -> str:
+        """Sign a GET URL (time_bucket only partitions the cache)."""
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket_name, "Key": s3_key},
+            ExpiresIn=expiration
+        )
+    
     def get_presigned_url(self, s3_key: str, expiration: int = 3600) -> Optional[str]:
         """
         Generate a presigned URL for temporary file access.
         
+        Repeated calls return the same URL, so browsers and CDNs can cache the
+        object. A URL is reused for at most half its lifetime, so the returned
+        URL is always valid for at least expiration / 2 seconds.
+        
         Args:
             s3_key: S3 key (path) of the file
             expiration: URL expiration time in seconds (default 1 hour)
@@ -163,12 +315,8 @@ class S3Service:
             return None
         
         try:
-            url = self.client.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": self.bucket_name, "Key": s3_key},
-                ExpiresIn=expiration
-            )
-            return url
+            time_bucket = int(time.time() // max(1, expiration // 2))
+            return self._signed_url(s3_key, expiration, time_bucket)
             
         except ClientError as e:
             logger.error(f"Failed to generate presigned URL: {str(e)}")
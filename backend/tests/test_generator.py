@@ -0,0 +1,63 @@
+"""
+Tests for streaming answers from the backend generator.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("google.generativeai")
+
+# Add backend directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rag.generator import Generator
+
+
+class FakeModel:
+    """Streams a fixed list of text chunks."""
+    
+    def __init__(self, chunks):
+        self.chunks = chunks
+    
+    async def generate_content_async(self, prompt, generation_config=None, stream=False):
+        async def response():
+            for text in self.chunks:
+                yield SimpleNamespace(text=text)
+        return response()
+
+
+def _stream_events(chunks):
+    generator = Generator.__new__(Generator)
+    generator.model = FakeModel(chunks)
+    generator._generation_config = lambda: None
+    generator._prepare_answer = lambda question, explain_like_10, top_k: {
+        'prompt': "prompt",
+        'sources': [],
+        'confidence_score': 0.5,
+        'similarity_scores': []
+    }
+    
+    async def collect():
+        return [event async for event in generator.agenerate_answer_stream("question?", top_k=3)]
+    
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("chunks, answer", [
+    (["ANSWER:\n- First point\n- Sec", "ond point\n\nSOU", "RCES:\n- doc.pdf"], "- First point\n- Second point"),
+    (["  ANS", "WER: ", " - Only point  ", "  \n", "SOURCES: doc.pdf"], "- Only point"),
+    (["- No framing at all\n", "- Second line"], "- No framing at all\n- Second line"),
+])
+def test_token_events_join_to_clean_answer(chunks, answer):
+    events = _stream_events(chunks)
+    
+    tokens = [data for event, data in events if event == 'token']
+    event, done = events[-1]
+    assert event == 'done'
+    assert done['answer'] == answer
+    assert "".join(tokens) == answer
@@ -56,19 +56,38 @@ DATA_DIR = BASE_DIR / "data"
 VECTORSTORE_DIR = BASE_DIR / "vectorstore"
 VECTORSTORE_INDEX_PATH = VECTORSTORE_DIR / "index.faiss"
 VECTORSTORE_PKL_PATH = VECTORSTORE_DIR / "index.pkl"
+CACHE_DIR = BASE_DIR / "cache"
+EMBEDDING_CACHE_PATH = CACHE_DIR / "embeddings.db"  # Chunk embeddings keyed by content hash
 
 # Text Splitting Configuration
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
+# Vector Store Index Configuration
+IVFPQ_MIN_VECTORS = 2000  # Corpora above this size use a compressed IVF-PQ index
+IVFPQ_NPROBE = 16  # Inverted lists scanned per query
+
+# Embedding Configuration
+EMBED_BATCH = 64  # Texts per embed_documents call
+EMBED_CONCURRENCY = 4  # embed_documents calls in flight at once
+INGEST_WORKERS = 4  # Workers saving/loading/splitting files during ingestion
+
 # Retrieval Configuration
 TOP_K_CHUNKS = 5  # Increased for better context understanding
+QUERY_EMBEDDING_CACHE_SIZE = 1024  # Query embeddings memoized per retriever
 
 # RAG Configuration
 TEMPERATURE = 0.7
 MAX_TOKENS = 1000
+STREAM_UPDATE_INTERVAL = 0.05  # Min seconds between streamed UI updates (<= 20 Hz)
+
+# Semantic Cache Configuration
+SEMANTIC_CACHE_THRESHOLD = 0.92  # Minimum cosine similarity for a cache hit
+SEMANTIC_CACHE_TTL = 3600  # Seconds
+SEMANTIC_CACHE_MAX_ENTRIES = 512  # Per namespace; least recently used are dropped first
 
 # Create directories if they don't exist
 DATA_DIR.mkdir(exist_ok=True)
 VECTORSTORE_DIR.mkdir(exist_ok=True)
+CACHE_DIR.mkdir(exist_ok=True)
 
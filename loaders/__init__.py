@@ -1,6 +1,6 @@
 """Document loaders module."""
 
-from .document_loader import DocumentLoader
+from .document_loader import DocumentLoader, load_and_split_document
 
-__all__ = ['DocumentLoader']
+__all__ = ['DocumentLoader', 'load_and_split_document']
 
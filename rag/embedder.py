@@ -5,6 +5,9 @@ Embedding generation using Gemini Embeddings API and FAISS storage.
 import os
 import pickle
 import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
 from typing import List
 import logging
@@ -18,6 +21,7 @@ import faiss
 import numpy as np
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 
 # Import GoogleGenerativeAIEmbeddings from langchain_google_genai (correct package)
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
@@ -28,11 +32,18 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from config import (
     get_gemini_api_key,
     GEMINI_EMBEDDING_MODEL,
+    EMBED_BATCH,
+    EMBED_CONCURRENCY,
+    EMBEDDING_CACHE_PATH,
+    IVFPQ_MIN_VECTORS,
+    IVFPQ_NPROBE,
     VECTORSTORE_DIR,
     VECTORSTORE_INDEX_PATH,
     VECTORSTORE_PKL_PATH
 )
 
+from utils.embedding_cache import EmbeddingCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,7 +65,11 @@ class Embedder:
             "model": GEMINI_EMBEDDING_MODEL  # Always provide model
         }
         self.embeddings = GoogleGenerativeAIEmbeddings(**init_params)
+        # Re-ingested or unchanged chunks reuse their stored embeddings
+        self.embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, GEMINI_EMBEDDING_MODEL)
         self.vectorstore = None
+        # mtime of the on-disk index that self.vectorstore was last saved to / loaded from
+        self.index_mtime = None
     
     def create_vectorstore(self, documents: List[Document]) -> FAISS:
         """
@@ -69,11 +84,12 @@ class Embedder:
         logger.info(f"Creating vector store from {len(documents)} documents...")
         
         try:
-            # Create FAISS vector store from documents
-            self.vectorstore = FAISS.from_documents(
-                documents=documents,
-                embedding=self.embeddings
-            )
+            # Embed in batches, then build the FAISS index from the vectors
+            texts = [doc.page_content for doc in documents]
+            metadatas = [doc.metadata for doc in documents]
+            vectors = self.get_embeddings(texts)
+            
+            self.vectorstore = self._wrap_index(self._build_index(vectors), texts, metadatas)
             
             logger.info("Vector store created successfully")
             return self.vectorstore
@@ -82,6 +98,134 @@ class Embedder:
             logger.error(f"Error creating vector store: {str(e)}")
             raise
     
+    def _wrap_index(
+        self,
+        index: faiss.Index,
+        texts: List[str],
+        metadatas: List[dict]
+    ) -> FAISS:
+        """
+        Build a FAISS vector store around an already populated index.
+        
+        Args:
+            index: FAISS index holding the vectors for the texts, in order
+            texts: Chunk texts
+            metadatas: Metadata for the texts
+            
+        Returns:
+            FAISS vector store
+        """
+        ids = [str(uuid.uuid4()) for _ in texts]
+        docstore = InMemoryDocstore({
+            doc_id: Document(page_content=text, metadata=metadata)
+            for doc_id, text, metadata in zip(ids, texts, metadatas)
+        })
+        
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=dict(enumerate(ids))
+        )
+    
+    def _build_index(self, vectors: np.ndarray) -> faiss.Index:
+        """
+        Build the index type suited to the number of vectors.
+        
+        Args:
+            vectors: 2-D float32 embedding matrix
+            
+        Returns:
+            Populated FAISS index
+        """
+        if len(vectors) > IVFPQ_MIN_VECTORS:
+            # Large corpus: product-quantized index (8-bit codes) instead of flat FP32
+            return self._build_ivfpq_index(vectors)
+        return self._build_fp16_index(vectors)
+    
+    @staticmethod
+    def _build_fp16_index(vectors: np.ndarray) -> faiss.IndexScalarQuantizer:
+        """
+        Build an exhaustive L2 index that stores vectors as FP16.
+        
+        Halves index memory and scan bandwidth versus IndexFlatL2 while keeping
+        L2 distances (and therefore confidence scores) practically unchanged.
+        Unlike HNSW it still supports remove_ids for per-file deletes.
+        
+        Args:
+            vectors: 2-D float32 embedding matrix
+            
+        Returns:
+            Populated scalar-quantizer index
+        """
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        index = faiss.IndexScalarQuantizer(
+            matrix.shape[1], faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2
+        )
+        # FP16 needs no statistics, but train() marks the index as ready
+        index.train(matrix)
+        index.add(matrix)
+        return index
+    
+    @staticmethod
+    def _build_ivfpq_index(vectors: np.ndarray) -> faiss.IndexIVFPQ:
+        """
+        Train and fill an IndexIVFPQ with the given vectors.
+        
+        Args:
+            vectors: 2-D float32 embedding matrix
+            
+        Returns:
+            Populated IVFPQ index with nprobe set
+        """
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        count, dim = matrix.shape
+        
+        nlist = min(4096, int(4 * np.sqrt(count)))
+        # Number of sub-quantizers must divide the embedding dimension
+        m = next(m for m in (64, 48, 32, 16, 8, 4, 2, 1) if dim % m == 0)
+        
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, 8)
+        index.train(matrix)
+        index.add(matrix)
+        index.nprobe = IVFPQ_NPROBE
+        
+        logger.info(f"Built IVFPQ index (nlist={nlist}, m={m}) for {count} vectors")
+        return index
+    
+    def _maybe_upgrade_index(self):
+        """
+        Re-index an exhaustive vector store as IVFPQ once it grows past IVFPQ_MIN_VECTORS.
+        
+        Vectors are reconstructed from the current index, so nothing is re-embedded,
+        and positions are kept so the docstore mapping stays valid. IVF indexes
+        support remove_ids but do not compact labels afterwards, so per-file
+        deletes from an upgraded store rebuild it (see delete_file_documents).
+        """
+        index = self.vectorstore.index
+        if isinstance(index, faiss.IndexIVF) or index.ntotal <= IVFPQ_MIN_VECTORS:
+            return
+        
+        self.vectorstore.index = self._build_ivfpq_index(index.reconstruct_n(0, index.ntotal))
+    
+    def copy_vectorstore(self, vectorstore: FAISS) -> FAISS:
+        """
+        Copy a vector store so it can be changed while the original is still searched.
+        
+        Args:
+            vectorstore: Vector store to copy
+            
+        Returns:
+            FAISS vector store with its own index, docstore and id mapping
+        """
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=faiss.clone_index(vectorstore.index),
+            docstore=InMemoryDocstore(dict(vectorstore.docstore._dict)),
+            index_to_docstore_id=dict(vectorstore.index_to_docstore_id)
+        )
+    
     def save_vectorstore(self, vectorstore: FAISS = None):
         """
         Save the vector store to disk.
@@ -97,6 +241,7 @@ class Embedder:
         try:
             # Save FAISS index
             store.save_local(str(VECTORSTORE_DIR))
+            self.index_mtime = VECTORSTORE_INDEX_PATH.stat().st_mtime_ns
             logger.info(f"Vector store saved to {VECTORSTORE_DIR}")
             
         except Exception as e:
@@ -122,6 +267,7 @@ class Embedder:
                 self.embeddings,
                 allow_dangerous_deserialization=True
             )
+            self.index_mtime = VECTORSTORE_INDEX_PATH.stat().st_mtime_ns
             logger.info("Vector store loaded successfully")
             return self.vectorstore
             
@@ -145,21 +291,136 @@ class Embedder:
                 return
         
         try:
-            self.vectorstore.add_documents(documents)
+            texts = [doc.page_content for doc in documents]
+            metadatas = [doc.metadata for doc in documents]
+            vectors = self.get_embeddings(texts)
+            
+            self.vectorstore.add_embeddings(
+                text_embeddings=list(zip(texts, vectors)),
+                metadatas=metadatas
+            )
+            self._maybe_upgrade_index()
             logger.info(f"Added {len(documents)} documents to vector store")
         except Exception as e:
             logger.error(f"Error adding documents: {str(e)}")
             raise
     
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def delete_file_documents(self, file_name: str) -> List[Document]:
         """
-        Get embeddings for a list of texts.
+        Remove all chunks of a source file from the vector store.
+        
+        Chunks are matched on the file name recorded in their metadata, so no
+        re-embedding of the remaining documents is needed.
+        
+        Args:
+            file_name: Name of the deleted file
+            
+        Returns:
+            List of removed Document chunks
+        """
+        if self.vectorstore is None:
+            self.load_vectorstore()
+        
+        docstore = self.vectorstore.docstore._dict
+        doc_ids = [
+            doc_id for doc_id, doc in docstore.items()
+            if Path(doc.metadata.get('file_path', doc.metadata.get('source', ''))).name == file_name
+        ]
+        removed_docs = [docstore[doc_id] for doc_id in doc_ids]
+        
+        if doc_ids and isinstance(self.vectorstore.index, faiss.IndexIVF):
+            # IVF remove_ids keeps the remaining vectors' labels, but FAISS.delete
+            # renumbers index_to_docstore_id to 0..n-1, so the two would disagree
+            self._rebuild_without(set(doc_ids))
+        elif doc_ids:
+            self.vectorstore.delete(ids=doc_ids)
+        
+        logger.info(f"Removed {len(doc_ids)} chunks of {file_name} from vector store")
+        return removed_docs
+    
+    def _rebuild_without(self, removed_ids: set):
+        """
+        Replace the vector store with a freshly built one holding all but the given chunks.
+        
+        Vectors of the kept chunks come from the embedding cache, so nothing is
+        re-embedded and the full-precision vectors (not PQ reconstructions) are
+        used to retrain the index.
+        
+        Args:
+            removed_ids: Docstore ids of the chunks to drop
+        """
+        docstore = self.vectorstore.docstore._dict
+        kept_ids = [
+            doc_id for _, doc_id in sorted(self.vectorstore.index_to_docstore_id.items())
+            if doc_id not in removed_ids
+        ]
+        
+        if kept_ids:
+            vectors = self.get_embeddings([docstore[doc_id].page_content for doc_id in kept_ids])
+        else:
+            vectors = np.empty((0, self.vectorstore.index.d), dtype=np.float32)
+        
+        self.vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=self._build_index(vectors),
+            docstore=InMemoryDocstore({doc_id: docstore[doc_id] for doc_id in kept_ids}),
+            index_to_docstore_id=dict(enumerate(kept_ids))
+        )
+    
+    def get_embeddings(self, texts: List[str], batch_size: int = EMBED_BATCH) -> np.ndarray:
+        """
+        Get embeddings for a list of texts, batching the embedding API calls.
+        
+        Texts embedded before (same content and model) are served from the
+        embedding cache; only the rest are sent to the API.
         
         Args:
             texts: List of text strings
+            batch_size: Number of texts per embed_documents call
             
         Returns:
-            List of embedding vectors
+            2-D float32 array with one embedding per row
+        """
+        hashes = [EmbeddingCache.key(text) for text in texts]
+        cached = self.embedding_cache.get_many(hashes)
+        
+        # Embed each uncached text once, even if it repeats within the batch
+        misses = {}
+        for h, text in zip(hashes, texts):
+            if h not in cached:
+                misses.setdefault(h, text)
+        
+        if misses:
+            fresh = self._embed_batches(list(misses.values()), batch_size)
+            new_vectors = dict(zip(misses, fresh))
+            self.embedding_cache.put_many(new_vectors.items())
+            cached.update(new_vectors)
+        
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        logger.info(f"Embedded {len(misses)} of {len(texts)} chunks ({len(texts) - len(misses)} cached)")
+        return np.vstack([cached[h] for h in hashes])
+    
+    def _embed_batches(self, texts: List[str], batch_size: int) -> np.ndarray:
         """
-        return self.embeddings.embed_documents(texts)
+        Embed texts through the API in batches.
+        
+        Batches are sent concurrently (up to EMBED_CONCURRENCY requests in flight);
+        the calls are network-bound, so threads overlap their latency.
+        """
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        
+        if len(batches) <= 1:
+            vectors = list(chain.from_iterable(map(self.embeddings.embed_documents, batches)))
+        else:
+            with ThreadPoolExecutor(max_workers=min(EMBED_CONCURRENCY, len(batches))) as pool:
+                # map keeps batch order, so rows line up with texts
+                vectors = list(chain.from_iterable(pool.map(self.embeddings.embed_documents, batches)))
+        
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        # Single conversion to a contiguous matrix; always 2-D, even for one text
+        return np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
 
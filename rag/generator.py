@@ -7,12 +7,15 @@ import os
 from pathlib import Path
 import logging
 import re
-from typing import Dict, List, Optional
+import time
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import google.generativeai as genai
+import numpy as np
 from langchain_core.documents import Document
 
 from config import get_gemini_api_key, GEMINI_LLM_MODEL, TEMPERATURE, MAX_TOKENS
@@ -20,6 +23,25 @@ from rag.retriever import Retriever
 
 logger = logging.getLogger(__name__)
 
+# Word tokenizer for keyword overlap scoring
+_WORD_RE = re.compile(r'\b\w+\b')
+
+
+@lru_cache(maxsize=4096)
+def _content_words(text: str) -> frozenset:
+    """Lower-cased word set of a chunk, cached because the same chunks are retrieved repeatedly."""
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
+# genai.list_models() is a network call whose answer changes rarely
+MODEL_DETECTION_TTL = 24 * 60 * 60
+
+
+@lru_cache(maxsize=1)
+def _latest_model(api_key: str, ttl_bucket: int) -> str:
+    """Memoized model detection; ttl_bucket advances once per MODEL_DETECTION_TTL."""
+    return Generator._detect_latest_model(api_key)
+
 
 class Generator:
     """Handles RAG pipeline and answer generation using Gemini."""
@@ -118,6 +140,11 @@ SOURCES: [List all sources used from the documents]
         self.retriever = retriever
     
     def _get_latest_model(self, api_key: str) -> str:
+        """Latest available model; detection runs at most once per MODEL_DETECTION_TTL per process."""
+        return _latest_model(api_key, int(time.time() // MODEL_DETECTION_TTL))
+    
+    @staticmethod
+    def _detect_latest_model(api_key: str) -> str:
         """
         Dynamically detect the latest available Gemini model that supports generateContent.
         
@@ -226,128 +253,272 @@ SOURCES: [List all sources used from the documents]
             Dictionary with answer, sources, and related questions
         """
         if not question or not question.strip():
-            return {
-                'answer': "Please provide a valid question.",
-                'sources': [],
-                'related_questions': [],
-                'context_used': []
-            }
+            return self._invalid_question_result()
         
         try:
-            # Retrieve relevant chunks with scores for confidence calculation
-            retrieved_docs_with_scores = self.retriever.retrieve_with_scores(question, k=top_k)
-            
-            if not retrieved_docs_with_scores:
-                return {
-                    'answer': "I couldn't find any relevant information in the knowledge base. Please make sure documents have been uploaded and processed.",
-                    'sources': [],
-                    'related_questions': [],
-                    'context_used': [],
-                    'confidence_score': 0.0
-                }
-            
-            # Extract documents and scores
-            retrieved_docs = [doc for doc, score in retrieved_docs_with_scores]
-            similarity_scores = [score for doc, score in retrieved_docs_with_scores]
-            
-            # Calculate improved confidence score based on similarity scores and context quality
-            # FAISS returns distance scores (lower is better for cosine/L2 distance)
-            # For cosine similarity embeddings, distance typically ranges from 0 to 2
-            if similarity_scores:
-                # Get the best (lowest) distance score
-                best_distance = min(similarity_scores)
-                avg_distance = sum(similarity_scores) / len(similarity_scores)
-                
-                # Convert distance to similarity score
-                # For cosine distance: similarity ≈ 1 - (distance/2) when normalized
-                # Using a more accurate conversion
-                best_similarity = max(0.0, 1.0 - (best_distance / 2.0))
-                avg_similarity = max(0.0, 1.0 - (avg_distance / 2.0))
-                
-                # Calculate score consistency (lower variance = higher confidence)
-                if len(similarity_scores) > 1:
-                    variance = sum((s - avg_distance) ** 2 for s in similarity_scores) / len(similarity_scores)
-                    consistency = 1.0 / (1.0 + variance)  # Higher consistency = higher confidence
-                else:
-                    consistency = 1.0
-                
-                # Calculate keyword match boost (if retriever provides it)
-                # Check if documents contain query keywords
-                query_lower = question.lower()
-                keyword_matches = 0
-                for doc in retrieved_docs:
-                    content_lower = doc.page_content.lower()
-                    # Count how many query words appear in the document
-                    query_words = set(re.findall(r'\b\w+\b', query_lower))
-                    content_words = set(re.findall(r'\b\w+\b', content_lower))
-                    matches = len(query_words.intersection(content_words))
-                    if matches > 0:
-                        keyword_matches += matches / len(query_words) if query_words else 0
-                
-                keyword_boost = min(1.0, keyword_matches / len(retrieved_docs)) if retrieved_docs else 0.0
-                
-                # Combine factors for final confidence score
-                # 50% best similarity, 30% average similarity, 10% consistency, 10% keyword match
-                confidence_score = (
-                    0.5 * best_similarity +
-                    0.3 * avg_similarity +
-                    0.1 * consistency +
-                    0.1 * keyword_boost
-                )
-                
-                # Apply sigmoid-like scaling for better distribution
-                # This makes the confidence score more discriminative
-                confidence_score = confidence_score ** 0.9  # Slight adjustment
-                
-                # Ensure confidence is in 0-1 range
-                confidence_score = max(0.0, min(1.0, confidence_score))
-            else:
-                confidence_score = 0.0
-            
-            # Format context
-            context = self.retriever.format_context(retrieved_docs)
-            
-            # Build prompt
-            prompt = self.RAG_PROMPT_TEMPLATE.format(
-                question=question,
-                context=context,
-                explain_mode="Yes" if explain_like_10 else "No"
-            )
+            result, prompt = self._prepare_answer(question, explain_like_10, top_k)
+            if prompt is None:
+                return result
             
             # Generate response
             response = self.model.generate_content(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=TEMPERATURE,
-                    max_output_tokens=MAX_TOKENS
-                )
+                generation_config=self._generation_config()
             )
             
             # Parse response
             answer_text = response.text
             
             # Extract components (simple parsing)
-            answer = self._extract_answer(answer_text)
-            sources = self.retriever.get_source_metadata(retrieved_docs)
-            
-            return {
-                'answer': answer,
-                'sources': sources,
-                'related_questions': [],  # No follow-up questions
-                'context_used': [doc.page_content for doc in retrieved_docs],
-                'raw_response': answer_text,
-                'confidence_score': confidence_score,
-                'similarity_scores': similarity_scores
-            }
+            result['answer'] = self._extract_answer(answer_text)
+            result['raw_response'] = answer_text
+            return result
             
         except Exception as e:
             logger.error(f"Error generating answer: {str(e)}")
+            return self._error_result(e)
+    
+    def generate_answer_stream(
+        self,
+        question: str,
+        explain_like_10: bool = False,
+        top_k: int = 5
+    ) -> Dict:
+        """
+        Generate an answer using RAG pipeline, streaming the answer text.
+        
+        Retrieval and confidence scoring happen up front; the LLM answer is
+        exposed as an iterator so it can be rendered as tokens arrive.
+        
+        Args:
+            question: User question
+            explain_like_10: Whether to simplify the explanation
+            top_k: Number of chunks to retrieve
+            
+        Returns:
+            Dictionary like generate_answer, plus 'answer_stream' (an iterator of
+            answer text chunks). 'answer' and 'raw_response' are filled in once
+            the stream has been consumed.
+        """
+        if not question or not question.strip():
+            result = self._invalid_question_result()
+        else:
+            try:
+                result, prompt = self._prepare_answer(question, explain_like_10, top_k)
+                if prompt is not None:
+                    response = self.model.generate_content(
+                        prompt,
+                        generation_config=self._generation_config(),
+                        stream=True
+                    )
+                    result['answer'] = ""
+                    result['answer_stream'] = self._stream_answer(response, result)
+                    return result
+            except Exception as e:
+                logger.error(f"Error generating answer: {str(e)}")
+                result = self._error_result(e)
+        
+        result['answer_stream'] = iter([result['answer']])
+        return result
+    
+    def _prepare_answer(self, question: str, explain_like_10: bool, top_k: int) -> Tuple[Dict, Optional[str]]:
+        """
+        Retrieve context, score confidence and build the prompt.
+        
+        Returns:
+            Tuple of (result dictionary without the answer, prompt). The prompt is
+            None when nothing was retrieved, in which case the result is final.
+        """
+        # Retrieve relevant chunks with scores for confidence calculation
+        retrieved_docs_with_scores = self.retriever.retrieve_with_scores(question, k=top_k)
+        
+        if not retrieved_docs_with_scores:
             return {
-                'answer': f"An error occurred while generating the answer: {str(e)}",
+                'answer': "I couldn't find any relevant information in the knowledge base. Please make sure documents have been uploaded and processed.",
                 'sources': [],
                 'related_questions': [],
-                'context_used': []
-            }
+                'context_used': [],
+                'confidence_score': 0.0
+            }, None
+        
+        # Extract documents and scores
+        retrieved_docs = [doc for doc, score in retrieved_docs_with_scores]
+        similarity_scores = [score for doc, score in retrieved_docs_with_scores]
+        
+        confidence_score = self._calculate_confidence(question, retrieved_docs, similarity_scores)
+        
+        # Format context
+        context = self.retriever.format_context(retrieved_docs)
+        
+        # Build prompt
+        prompt = self.RAG_PROMPT_TEMPLATE.format(
+            question=question,
+            context=context,
+            explain_mode="Yes" if explain_like_10 else "No"
+        )
+        
+        result = {
+            'sources': self.retriever.get_source_metadata(retrieved_docs),
+            'related_questions': [],  # No follow-up questions
+            'context_used': [doc.page_content for doc in retrieved_docs],
+            'confidence_score': confidence_score,
+            'similarity_scores': similarity_scores
+        }
+        return result, prompt
+    
+    def _calculate_confidence(
+        self,
+        question: str,
+        retrieved_docs: List[Document],
+        similarity_scores: List[float]
+    ) -> float:
+        """
+        Calculate a confidence score from retrieval distances and keyword overlap.
+        
+        Args:
+            question: User question
+            retrieved_docs: Retrieved documents
+            similarity_scores: FAISS distance scores for the documents
+            
+        Returns:
+            Confidence score in the 0-1 range
+        """
+        # Calculate improved confidence score based on similarity scores and context quality
+        # FAISS returns distance scores (lower is better for cosine/L2 distance)
+        # For cosine similarity embeddings, distance typically ranges from 0 to 2
+        if not similarity_scores:
+            return 0.0
+        
+        if len(similarity_scores) == 1:
+            # Single chunk (top_k=1): best and average coincide, no array or variance needed
+            best_similarity = avg_similarity = max(0.0, 1.0 - (float(similarity_scores[0]) / 2.0))
+            consistency = 1.0
+        else:
+            # Get the best (lowest) distance score
+            distances = np.asarray(similarity_scores, dtype=np.float32)
+            best_distance = float(distances.min())
+            avg_distance = float(distances.mean())
+            
+            # Convert distance to similarity score
+            # For cosine distance: similarity ≈ 1 - (distance/2) when normalized
+            # Using a more accurate conversion
+            best_similarity = max(0.0, 1.0 - (best_distance / 2.0))
+            avg_similarity = max(0.0, 1.0 - (avg_distance / 2.0))
+            
+            # Calculate score consistency (lower variance = higher confidence)
+            variance = float(distances.var())
+            consistency = 1.0 / (1.0 + variance)  # Higher consistency = higher confidence
+        
+        # Calculate keyword match boost (if retriever provides it)
+        # Check if documents contain query keywords
+        query_words = set(_WORD_RE.findall(question.lower()))
+        keyword_matches = 0
+        if query_words:
+            for doc in retrieved_docs:
+                # Count how many query words appear in the document
+                matches = len(query_words.intersection(_content_words(doc.page_content)))
+                keyword_matches += matches / len(query_words)
+        
+        keyword_boost = min(1.0, keyword_matches / len(retrieved_docs)) if retrieved_docs else 0.0
+        
+        # Combine factors for final confidence score
+        # 50% best similarity, 30% average similarity, 10% consistency, 10% keyword match
+        confidence_score = (
+            0.5 * best_similarity +
+            0.3 * avg_similarity +
+            0.1 * consistency +
+            0.1 * keyword_boost
+        )
+        
+        # Apply sigmoid-like scaling for better distribution
+        # This makes the confidence score more discriminative
+        confidence_score = confidence_score ** 0.9  # Slight adjustment
+        
+        # Ensure confidence is in 0-1 range
+        confidence_score = max(0.0, min(1.0, confidence_score))
+        
+        return confidence_score
+    
+    def _generation_config(self):
+        """Generation parameters for answer generation."""
+        return genai.types.GenerationConfig(
+            temperature=TEMPERATURE,
+            max_output_tokens=MAX_TOKENS
+        )
+    
+    def _stream_answer(self, response, result: Dict) -> Iterator[str]:
+        """
+        Yield answer text from a streamed response, dropping the ANSWER:/SOURCES: framing.
+        
+        Fills in result['answer'] and result['raw_response'] when the stream ends.
+        """
+        answer_marker = "ANSWER:"
+        sources_marker = "SOURCES:"
+        raw_parts = []
+        pending = ""
+        started = False
+        finished = False
+        
+        try:
+            for chunk in response:
+                text = chunk.text
+                raw_parts.append(text)
+                if finished:
+                    continue
+                
+                pending += text
+                if not started:
+                    stripped = pending.lstrip()
+                    # Wait until we can tell whether the answer starts with the marker
+                    if answer_marker.startswith(stripped):
+                        continue
+                    if stripped.startswith(answer_marker):
+                        pending = stripped[len(answer_marker):].lstrip()
+                    started = True
+                
+                if sources_marker in pending:
+                    yield pending.split(sources_marker, 1)[0].rstrip()
+                    pending = ""
+                    finished = True
+                    continue
+                
+                # Hold back a tail that could be the start of the sources marker
+                safe = len(pending) - (len(sources_marker) - 1)
+                if safe > 0:
+                    yield pending[:safe]
+                    pending = pending[safe:]
+            
+            if not finished and pending:
+                yield pending
+            
+            answer_text = "".join(raw_parts)
+            result['answer'] = self._extract_answer(answer_text)
+            result['raw_response'] = answer_text
+            
+        except Exception as e:
+            logger.error(f"Error streaming answer: {str(e)}")
+            result.update(self._error_result(e))
+            yield f"\n\n{result['answer']}"
+    
+    @staticmethod
+    def _invalid_question_result() -> Dict:
+        """Result returned for an empty question."""
+        return {
+            'answer': "Please provide a valid question.",
+            'sources': [],
+            'related_questions': [],
+            'context_used': []
+        }
+    
+    @staticmethod
+    def _error_result(error: Exception) -> Dict:
+        """Result returned when answer generation fails."""
+        return {
+            'answer': f"An error occurred while generating the answer: {str(error)}",
+            'sources': [],
+            'related_questions': [],
+            'context_used': []
+        }
     
     def _extract_answer(self, response_text: str) -> str:
         """Extract answer from response text."""
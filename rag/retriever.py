@@ -6,18 +6,42 @@ import sys
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 import logging
-import re
+import string
+from functools import lru_cache
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import numpy as np
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 
-from config import TOP_K_CHUNKS
+from config import QUERY_EMBEDDING_CACHE_SIZE, TOP_K_CHUNKS
 
 logger = logging.getLogger(__name__)
 
+# Common stop words dropped from query keywords
+_STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'what', 'which', 'who', 'whom', 'whose', 'where', 'when', 'why', 'how'})
+
+# Punctuation other than hyphens and apostrophes becomes a word break
+_PUNCT_TABLE = str.maketrans({c: ' ' for c in string.punctuation if c not in "-'"})
+
+
+@lru_cache(maxsize=4096)
+def _lowered(text: str) -> str:
+    """Lower-cased chunk text, cached because the same chunks are scored for many queries."""
+    return text.lower()
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first; equal scores keep search order."""
+    if k < len(scores):
+        # O(n) selection, then only the k winners are sorted
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
 
 class Retriever:
     """Handles retrieval of relevant document chunks from vector store."""
@@ -30,6 +54,10 @@ class Retriever:
             vectorstore: FAISS vector store instance
         """
         self.vectorstore = vectorstore
+        # Per-retriever, so cached embeddings go away with the knowledge base version
+        self._embed_query = lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)(
+            vectorstore.embedding_function.embed_query
+        )
     
     def _extract_keywords(self, query: str) -> List[str]:
         """
@@ -41,36 +69,30 @@ class Retriever:
         Returns:
             List of keywords
         """
-        # Remove common stop words
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'what', 'which', 'who', 'whom', 'whose', 'where', 'when', 'why', 'how'}
-        
-        # Extract words (alphanumeric, hyphens, apostrophes)
-        words = re.findall(r'\b[a-zA-Z0-9\-\']+\b', query.lower())
-        
-        # Filter out stop words and short words
-        keywords = [w for w in words if w not in stop_words and len(w) > 2]
-        
-        # Remove duplicates while preserving order
+        keywords = []
         seen = set()
-        unique_keywords = []
-        for kw in keywords:
-            if kw not in seen:
-                seen.add(kw)
-                unique_keywords.append(kw)
+        # One pass: split on punctuation/whitespace, drop stop words, short words and duplicates
+        for word in query.lower().translate(_PUNCT_TABLE).split():
+            word = word.strip("-'")
+            if len(word) > 2 and word not in _STOP_WORDS and word not in seen:
+                seen.add(word)
+                keywords.append(word)
         
-        return unique_keywords
+        return keywords
     
-    def _expand_query(self, query: str) -> str:
+    def _expand_query(self, query: str, keywords: Optional[List[str]] = None) -> str:
         """
         Expand query with keywords and context for better retrieval.
         
         Args:
             query: Original query
+            keywords: Keywords already extracted from the query (extracted here if None)
             
         Returns:
             Expanded query string
         """
-        keywords = self._extract_keywords(query)
+        if keywords is None:
+            keywords = self._extract_keywords(query)
         
         # If we have keywords, add them to the query
         if keywords:
@@ -94,8 +116,8 @@ class Retriever:
         if not keywords:
             return 0.0
         
-        content_lower = document.page_content.lower()
-        matches = sum(1 for kw in keywords if kw.lower() in content_lower)
+        content_lower = _lowered(document.page_content)
+        matches = sum(1 for kw in keywords if kw in content_lower)
         
         # Normalize by number of keywords
         return matches / len(keywords) if keywords else 0.0
@@ -147,52 +169,39 @@ class Retriever:
             keywords = self._extract_keywords(query)
             
             # Retrieve more chunks than needed for better filtering
-            retrieve_k = min(k * 3, 20)  # Retrieve 3x more, max 20
-            
-            # Use expanded query for initial retrieval
-            expanded_query = self._expand_query(query)
+            # (3x more, max 20, never more than the index holds)
+            retrieve_k = min(k * 3, 20, self.vectorstore.index.ntotal)
+            if retrieve_k == 0:
+                logger.warning("Vector store is empty")
+                return []
             
-            # Search with scores using expanded query
-            docs_with_scores = self.vectorstore.similarity_search_with_score(
-                query=expanded_query,
+            # Search with scores using the expanded query; a repeated query reuses its embedding
+            embedding = self._embed_query(self._expand_query(query, keywords))
+            docs_with_scores = self.vectorstore.similarity_search_with_score_by_vector(
+                embedding,
                 k=retrieve_k
             )
             
-            if not docs_with_scores:
-                # Fallback to original query if expanded query fails
-                docs_with_scores = self.vectorstore.similarity_search_with_score(
-                    query=query,
-                    k=retrieve_k
-                )
-            
             if not docs_with_scores:
                 logger.warning(f"No documents retrieved for query: {query[:50]}...")
                 return []
             
-            # Enhance scores with keyword matching
-            enhanced_results = []
-            for doc, distance_score in docs_with_scores:
-                # Calculate keyword match score
-                keyword_score = self._calculate_keyword_match_score(doc, keywords)
-                
-                # Convert distance to similarity (lower distance = higher similarity)
-                # For cosine distance: similarity ≈ 1 - distance
-                # Normalize distance to 0-1 range (assuming max distance ~2 for cosine)
-                normalized_distance = min(distance_score / 2.0, 1.0) if distance_score > 0 else 0.0
-                similarity_score = 1.0 - normalized_distance
-                
-                # Combine similarity and keyword match (weighted)
-                # 70% similarity, 30% keyword match
-                combined_score = 0.7 * similarity_score + 0.3 * keyword_score
-                
-                # Store enhanced score (we'll use distance for sorting, but combined for confidence)
-                enhanced_results.append((doc, distance_score, combined_score, keyword_score))
+            # Enhance scores with keyword matching (vectorized over all candidates)
+            distances = np.fromiter((score for _, score in docs_with_scores), dtype=np.float32)
+            keyword_scores = np.fromiter(
+                (self._calculate_keyword_match_score(doc, keywords) for doc, _ in docs_with_scores),
+                dtype=np.float32
+            )
+            
+            # Convert distance to similarity (lower distance = higher similarity),
+            # normalizing to the 0-1 range (max distance ~2 for normalized embeddings)
+            similarity_scores = 1.0 - np.clip(distances / 2.0, 0.0, 1.0)
             
-            # Sort by combined score (higher is better)
-            enhanced_results.sort(key=lambda x: x[2], reverse=True)
+            # Combine similarity and keyword match: 70% similarity, 30% keyword match
+            combined_scores = 0.7 * similarity_scores + 0.3 * keyword_scores
             
-            # Take top k results
-            final_results = [(doc, distance) for doc, distance, combined, _ in enhanced_results[:k]]
+            # Take top k results by combined score, keeping the FAISS distances
+            final_results = [docs_with_scores[i] for i in _top_k(combined_scores, k)]
             
             logger.info(f"Retrieved {len(final_results)} chunks with enhanced scoring for query: {query[:50]}...")
             return final_results
@@ -0,0 +1,132 @@
+"""
+Tests for changing the FAISS vector store: per-file deletes, adds and copies.
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+pytest.importorskip("langchain_google_genai")
+pytest.importorskip("nest_asyncio")
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from config import IVFPQ_MIN_VECTORS
+from rag.embedder import Embedder
+from utils.embedding_cache import EmbeddingCache
+
+DIM = 32
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic, well-separated random vectors seeded by the text."""
+    
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+    
+    def embed_query(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32).tolist()
+
+
+@pytest.fixture
+def embedder(tmp_path):
+    embedder = Embedder.__new__(Embedder)
+    embedder.embeddings = HashEmbeddings()
+    embedder.embedding_cache = EmbeddingCache(tmp_path / "embeddings.db", "test")
+    embedder.vectorstore = None
+    embedder.index_mtime = None
+    return embedder
+
+
+def _chunks(file_name, count):
+    return [
+        Document(page_content=f"{file_name} chunk {i}", metadata={"file_path": f"data/{file_name}"})
+        for i in range(count)
+    ]
+
+
+def _assert_consistent(store):
+    assert store.index.ntotal == len(store.index_to_docstore_id) == len(store.docstore._dict)
+    assert set(store.index_to_docstore_id.values()) == set(store.docstore._dict)
+
+
+def test_delete_from_ivfpq_store_keeps_search_consistent(embedder):
+    kept = _chunks("kept.txt", IVFPQ_MIN_VECTORS + 100)
+    # Interleave so the deleted labels are spread over the whole index
+    deleted = _chunks("deleted.txt", 300)
+    store = embedder.create_vectorstore([doc for pair in zip(kept, deleted) for doc in pair] + kept[300:])
+    assert isinstance(store.index, faiss.IndexIVF)
+    
+    removed = embedder.delete_file_documents("deleted.txt")
+    
+    assert len(removed) == len(deleted)
+    store = embedder.vectorstore
+    _assert_consistent(store)
+    assert store.index.ntotal == len(kept)
+    
+    for doc in kept[::97]:
+        results = store.similarity_search_by_vector(embedder.embeddings.embed_query(doc.page_content), k=3)
+        assert results[0].page_content == doc.page_content
+        assert all(result.metadata["file_path"] != "data/deleted.txt" for result in results)
+
+
+def test_add_after_ivfpq_delete(embedder):
+    kept = _chunks("b.txt", IVFPQ_MIN_VECTORS + 100)
+    embedder.create_vectorstore(_chunks("a.txt", 300) + kept)
+    embedder.delete_file_documents("a.txt")
+    assert isinstance(embedder.vectorstore.index, faiss.IndexIVF)
+    
+    added = _chunks("c.txt", 50)
+    embedder.add_documents(added)
+    
+    store = embedder.vectorstore
+    _assert_consistent(store)
+    assert store.index.ntotal == IVFPQ_MIN_VECTORS + 150
+    # New labels must not collide with those of chunks that survived the delete
+    for doc in added[::7] + kept[-300::29]:
+        result = store.similarity_search_by_vector(embedder.embeddings.embed_query(doc.page_content), k=1)
+        assert result[0].page_content == doc.page_content
+
+
+def test_delete_after_upgrade_to_ivfpq(embedder):
+    kept = _chunks("kept.txt", IVFPQ_MIN_VECTORS)
+    embedder.create_vectorstore(_chunks("deleted.txt", 200))
+    assert not isinstance(embedder.vectorstore.index, faiss.IndexIVF)
+    
+    # Growing past IVFPQ_MIN_VECTORS upgrades the flat index in place
+    embedder.add_documents(kept)
+    assert isinstance(embedder.vectorstore.index, faiss.IndexIVF)
+    
+    embedder.delete_file_documents("deleted.txt")
+    
+    store = embedder.vectorstore
+    _assert_consistent(store)
+    assert store.index.ntotal == len(kept)
+    for doc in kept[::97]:
+        result = store.similarity_search_by_vector(embedder.embeddings.embed_query(doc.page_content), k=1)
+        assert result[0].page_content == doc.page_content
+
+
+def test_changing_a_copy_leaves_the_original_searchable(embedder):
+    original = embedder.create_vectorstore(_chunks("a.txt", 100) + _chunks("b.txt", 100))
+    
+    embedder.vectorstore = embedder.copy_vectorstore(original)
+    embedder.delete_file_documents("a.txt")
+    embedder.add_documents(_chunks("c.txt", 50))
+    
+    _assert_consistent(original)
+    assert original.index.ntotal == 200
+    doc = _chunks("a.txt", 1)[0]
+    result = original.similarity_search_by_vector(embedder.embeddings.embed_query(doc.page_content), k=1)
+    assert result[0].page_content == doc.page_content
+    assert embedder.vectorstore.index.ntotal == 150
@@ -1,6 +1,5 @@
 """Utility functions module."""
 
-from .text_splitter import TextSplitter
 from .helpers import (
     setup_logging,
     save_uploaded_file,
@@ -12,6 +11,8 @@ from .helpers import (
 
 __all__ = [
     'TextSplitter',
+    'SemanticCache',
+    'EmbeddingCache',
     'setup_logging',
     'save_uploaded_file',
     'get_uploaded_files',
@@ -20,3 +21,16 @@ __all__ = [
     'clear_vectorstore'
 ]
 
+
+def __getattr__(name):
+    """Import LangChain/FAISS-backed utilities only when they are first accessed."""
+    if name == 'TextSplitter':
+        from .text_splitter import TextSplitter
+        return TextSplitter
+    if name == 'SemanticCache':
+        from .semantic_cache import SemanticCache
+        return SemanticCache
+    if name == 'EmbeddingCache':
+        from .embedding_cache import EmbeddingCache
+        return EmbeddingCache
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
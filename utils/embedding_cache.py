@@ -0,0 +1,96 @@
+"""
+Persistent embedding cache backed by SQLite.
+Avoids re-embedding chunks whose content has been embedded before.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Stay well below SQLite's limit on host parameters per statement
+_MAX_PARAMS = 500
+
+
+class EmbeddingCache:
+    """Stores float32 embeddings keyed by (model, SHA-256 of the text)."""
+    
+    def __init__(self, path: Path, model: str):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            path: SQLite database file
+            model: Embedding model name; vectors from other models are never returned
+        """
+        self.model = model
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS emb ("
+            "model TEXT NOT NULL, h BLOB NOT NULL, vec BLOB NOT NULL, "
+            "PRIMARY KEY (model, h))"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def key(text: str) -> bytes:
+        """Content hash used as the cache key for a text."""
+        return hashlib.sha256(text.encode("utf-8")).digest()
+    
+    def get_many(self, hashes: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Look up cached embeddings.
+        
+        Args:
+            hashes: Content hashes from key()
+        
+        Returns:
+            Mapping of hash to embedding for the hashes that are cached
+        """
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        
+        with self._lock:
+            for start in range(0, len(unique), _MAX_PARAMS):
+                batch = unique[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT h, vec FROM emb WHERE model = ? AND h IN ({placeholders})",
+                    [self.model, *batch]
+                )
+                for h, vec in rows:
+                    found[h] = np.frombuffer(vec, dtype=np.float32)
+        
+        return found
+    
+    def put_many(self, items: Iterable[Tuple[bytes, np.ndarray]]):
+        """
+        Store embeddings.
+        
+        Args:
+            items: (content hash, embedding) pairs
+        """
+        rows = [
+            (self.model, h, np.asarray(vector, dtype=np.float32).tobytes())
+            for h, vector in items
+        ]
+        if not rows:
+            return
+        
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO emb (model, h, vec) VALUES (?, ?, ?)", rows
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to store embeddings in cache: {str(e)}")
@@ -41,12 +41,14 @@ def get_uploaded_files(directory: Path) -> List[Path]:
     if not directory.exists():
         return []
     
-    supported_extensions = {'.pdf', '.docx', '.doc', '.txt'}
+    supported_extensions = ('.pdf', '.docx', '.doc', '.txt')
     files = []
     
-    for file_path in directory.iterdir():
-        if file_path.is_file() and file_path.suffix.lower() in supported_extensions:
-            files.append(file_path)
+    # os.scandir reuses the directory entry's file type instead of a stat() per file
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(supported_extensions):
+                files.append(Path(entry.path))
     
     return files
 
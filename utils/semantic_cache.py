@@ -0,0 +1,184 @@
+"""
+Semantic cache for question answering.
+Returns a previous answer when a new question is close enough in embedding space.
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+from typing import Dict, Hashable, Optional
+import logging
+
+import faiss
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Caches answers keyed by question embeddings using a FAISS inner-product index."""
+    
+    def __init__(
+        self,
+        embedder,
+        dim: Optional[int] = None,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES
+    ):
+        """
+        Initialize the semantic cache.
+        
+        Args:
+            embedder: Embedder instance used to embed questions
+            dim: Embedding dimension (inferred from the first embedding if None)
+            threshold: Minimum cosine similarity for a cache hit
+            ttl: Time-to-live of cached entries in seconds
+            max_entries: Entries kept per namespace before least recently used ones are evicted
+        """
+        self.embedder = embedder
+        self.dim = dim
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._namespaces: Dict[Hashable, Dict] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize_question(question: str) -> str:
+        """Normalize case and whitespace so trivial rephrasings embed identically."""
+        return " ".join(question.lower().split())
+    
+    def embed(self, question: str) -> Optional[np.ndarray]:
+        """
+        Embed a question as a L2-normalized float32 row vector.
+        
+        Compute it once per question and pass it to get() and put().
+        
+        Args:
+            question: User question
+        
+        Returns:
+            Row vector, or None if the embedding call failed
+        """
+        try:
+            vector = np.asarray(
+                [self.embedder.embeddings.embed_query(self._normalize_question(question))],
+                dtype=np.float32
+            )
+        except Exception as e:
+            logger.warning(f"Semantic cache skipped: {str(e)}")
+            return None
+        faiss.normalize_L2(vector)
+        return vector
+    
+    def get(
+        self,
+        question: str,
+        namespace: Hashable = None,
+        vector: Optional[np.ndarray] = None
+    ) -> Optional[Dict]:
+        """
+        Look up a cached answer for a semantically similar question.
+        
+        Args:
+            question: User question
+            namespace: Cache partition (e.g. knowledge base version and answer mode)
+            vector: Question embedding from embed() (computed here if None)
+        
+        Returns:
+            Copy of the cached result dictionary with 'cache_hit' set, or None on a miss
+        """
+        with self._lock:
+            bucket = self._namespaces.get(namespace)
+            if bucket is None or bucket['index'].ntotal == 0:
+                return None
+        
+        if vector is None:
+            vector = self.embed(question)
+            if vector is None:
+                return None
+        
+        with self._lock:
+            index = bucket['index']
+            scores, ids = index.search(vector, min(5, index.ntotal))
+            now = time.time()
+            
+            for score, idx in zip(scores[0], ids[0]):
+                if idx < 0 or score < self.threshold:
+                    break
+                result, created_at = bucket['entries'][idx]
+                if now - created_at <= self.ttl:
+                    bucket['last_used'][idx] = now
+                    logger.info(f"Semantic cache hit (similarity {score:.3f}) for: {question[:50]}...")
+                    return dict(result, cache_hit=True)
+        
+        return None
+    
+    def put(
+        self,
+        question: str,
+        result: Dict,
+        namespace: Hashable = None,
+        vector: Optional[np.ndarray] = None
+    ):
+        """
+        Store an answer for a question.
+        
+        Args:
+            question: User question
+            result: Result dictionary returned by the generator
+            namespace: Cache partition (e.g. knowledge base version and answer mode)
+            vector: Question embedding from embed() (computed here if None)
+        """
+        if vector is None:
+            vector = self.embed(question)
+            if vector is None:
+                return
+        
+        with self._lock:
+            if self.dim is None:
+                self.dim = vector.shape[1]
+            
+            bucket = self._namespaces.get(namespace)
+            if bucket is None:
+                bucket = {'index': faiss.IndexFlatIP(self.dim), 'entries': [], 'last_used': []}
+                self._namespaces[namespace] = bucket
+            
+            now = time.time()
+            entries = bucket['entries']
+            if entries and (now - entries[0][1] > self.ttl or len(entries) >= self.max_entries):
+                self._evict(bucket, now)
+            
+            bucket['index'].add(vector)
+            bucket['entries'].append((result, now))
+            bucket['last_used'].append(now)
+    
+    def _evict(self, bucket: Dict, now: float):
+        """Rebuild a namespace index without expired entries; when full, drop the least recently used quarter."""
+        live = [
+            i for i, (_, created_at) in enumerate(bucket['entries'])
+            if now - created_at <= self.ttl
+        ]
+        if len(live) >= self.max_entries:
+            drop = max(1, self.max_entries // 4) + len(live) - self.max_entries
+            live = sorted(sorted(live, key=lambda i: bucket['last_used'][i])[drop:])
+        index = faiss.IndexFlatIP(self.dim)
+        if live:
+            vectors = bucket['index'].reconstruct_n(0, bucket['index'].ntotal)
+            index.add(vectors[live])
+        
+        bucket['index'] = index
+        bucket['entries'] = [bucket['entries'][i] for i in live]
+        bucket['last_used'] = [bucket['last_used'][i] for i in live]
+    
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._namespaces.clear()